@@ -5,19 +5,56 @@ Python 3 script template (changeme)
 """
 
 import better_exceptions
-from itertools import permutations
+from functools import lru_cache
 import logging
-from pyfiglet import Figlet, FontNotFound
+from pleiades.mastodon.cache import AnswerCache, DEFAULT_ANSWER_CACHE_SIZE
+from pleiades.mastodon.fuzzy import DEFAULT_MAX_EDITS, FuzzyIndex
+from pleiades.mastodon.index import ModifiedIndex, NameIndex
+from pleiades.mastodon.periods import (
+    AT, format_spans, FROM, parse_span, PeriodIndex)
+from pleiades.mastodon.places import (
+    iter_places, place_id, place_modified, place_names, place_periods,
+    place_point)
+from pleiades.mastodon.spatial import DEFAULT_NEAR_COUNT, SpatialIndex
+from pleiades.mastodon.superluminal import Superluminal
 import random
 import re
-import sys
 import textnorm
+import threading
+from time import perf_counter
 import unicodedata
 
 logger = logging.getLogger(__name__)
-punct_table = dict.fromkeys(
-    i for i in range(sys.maxunicode)
-    if unicodedata.category(chr(i)).startswith('P'))
+PUNCT_CACHE_SIZE = 4096
+DEFAULT_LATEST_COUNT = 10
+# signed decimals survive punctuation removal as coordinates
+NUMBER = re.compile(r'(?<!\w)-?\d+(\.\d+)?(?!\w)')
+MINUS_SIGN = '\u2212'
+DECIMAL_POINT = '\u2219'
+YEAR = r'(ad |ce )?-?\d+( bc| bce| ad| ce)?'
+
+
+@lru_cache(maxsize=PUNCT_CACHE_SIZE)
+def _is_punctuation(codepoint: int):
+    return unicodedata.category(chr(codepoint)).startswith('P')
+
+
+class PunctuationTable:
+    """
+    str.translate() table that deletes Unicode punctuation.
+
+    Categories are looked up only for code points that actually occur,
+    through a bounded cache, rather than tabulated for all of Unicode at
+    import time.
+    """
+
+    def __getitem__(self, codepoint: int):
+        if _is_punctuation(codepoint):
+            return None
+        raise LookupError(codepoint)
+
+
+punct_table = PunctuationTable()
 
 IGNORE = [
     'please',
@@ -92,7 +129,37 @@ directives = {
         'triggers': ['age', 'old', 'when'],
         'handler': 'age',
         'matchers': [
-            re.compile(r'^(how old|when|age) (?P<tokens>.+)$')
+            re.compile(r'^(how old|when|age) (?P<tokens>.+)$'),
+            re.compile(r'^(?P<tokens>(in|during|around) {})$'.format(YEAR)),
+            re.compile(
+                r'^(?P<tokens>(between|from) {0} (and|to|until) {0})$'.format(
+                    YEAR))
+        ]
+    },
+    'list_age': {
+        'triggers': ['list in', 'list during', 'list around',
+                     'list between', 'list from'],
+        'handler': 'list_age',
+        'matchers': [
+            re.compile(
+                r'^list (?P<tokens>(in|during|around) {})$'.format(YEAR)),
+            re.compile(
+                r'^list (?P<tokens>(between|from) {0} (and|to|until) {0})$'
+                .format(YEAR))
+        ]
+    },
+    'near': {
+        'triggers': ['near', 'nearby', 'close to', 'around'],
+        'handler': 'near',
+        'matchers': [
+            re.compile(r'^(near|nearby|close to|around) (?P<tokens>.+)$')
+        ]
+    },
+    'list_near': {
+        'triggers': ['list near'],
+        'handler': 'list_near',
+        'matchers': [
+            re.compile(r'^(list near) (?P<tokens>.+)$')
         ]
     }
 }
@@ -101,29 +168,172 @@ for k, d in directives.items():
     triggers.extend(d['triggers'])
 triggers = list(set(triggers))
 triggers.sort(key=len)
+SUPERLUMINAL = [
+    'superluminal', 'beamship', 'phase conjugate', 'reverse time travel',
+    'ophanim', 'wingmakers', 'starseed', 'golden ratio']
+superluminal_matcher = re.compile(
+    '|'.join([re.escape(k) for k in SUPERLUMINAL]))
+
+
+def _compile_dispatcher(directives: dict):
+    """
+    Fold every directive matcher into one alternation, in directive order.
+
+    Each matcher is wrapped in a named group so the winning alternative
+    identifies its handler. Alternatives are tried left to right, so the
+    first matcher to succeed wins just as in the old nested loop.
+
+    The old loop also required one of the directive's triggers to occur
+    in the question first. Triggers are not consulted here: the bare
+    period matchers of age ("in 300 bc", "between 100 bc and 100 ad")
+    contain none of its triggers and would never be reached behind them.
+    The trigger lists are read only by scripts/bench_dispatch.py, which
+    replays the old loop on questions both dispatchers agree on.
+
+    Order decides overlaps. Age comes before near, so "around <year>"
+    asks what was active then, while "around <name>" (or a pid, or
+    coordinates) matches no age matcher and asks what is near it.
+    """
+    alternatives = []
+    routes = {}
+    for key, directive in directives.items():
+        for i, matcher in enumerate(directive['matchers']):
+            group = '{}_{}'.format(key, i)
+            pattern = matcher.pattern
+            if '(?P<tokens>' in pattern:
+                tokens_group = '{}_tokens'.format(group)
+                pattern = pattern.replace(
+                    '(?P<tokens>', '(?P<{}>'.format(tokens_group))
+            else:
+                tokens_group = None
+            alternatives.append('(?P<{}>{})'.format(group, pattern))
+            routes[group] = (directive['handler'], tokens_group)
+    return re.compile('|'.join(alternatives)), routes
+
+
+dispatcher, routes = _compile_dispatcher(directives)
+
+
+def dispatch(clean_question: str):
+    """Return (handler, tokens) for a cleaned question, or None."""
+    m = dispatcher.match(clean_question)
+    if m is None:
+        return None
+    handler, tokens_group = routes[m.lastgroup]
+    if tokens_group is None:
+        tokens = []
+    else:
+        tokens = m.group(tokens_group).split()
+    return handler, tokens
 
 
 class Brain:
+    """
+    Answers questions about places in a walked Pleiades collection.
+    """
+
+    def __init__(self, place_collection,
+                 cache_size=DEFAULT_ANSWER_CACHE_SIZE, cache_ttl=None,
+                 latest_count=DEFAULT_LATEST_COUNT, metrics=None,
+                 max_edits=DEFAULT_MAX_EDITS, near_count=DEFAULT_NEAR_COUNT):
+        self.metrics = metrics
+        self.places = {}
+        self._positions = {}
+        self._lock = threading.RLock()
+        self.answer_cache = AnswerCache(cache_size, cache_ttl)
+        self.latest_count = latest_count
+        self.near_count = near_count
+        self._latest_rendered = None
+        self._rendered = {}
+        self.superluminal = Superluminal()
+        self.name_index = NameIndex([], self._normalize)
+        self.fuzzy_index = FuzzyIndex(self._normalize, max_edits)
+        self.modified_index = ModifiedIndex()
+        self.spatial_index = SpatialIndex()
+        self.period_index = PeriodIndex()
+        for place in iter_places(place_collection):
+            self._add(place)
+        self.spatial_index.build()
+        self.period_index.build()
 
-    def __init__(self, place_collection):
-        self.place_collection = place_collection
+    def _add(self, place):
+        pid = place_id(place)
+        self.places[pid] = place
+        names = place_names(place)
+        self._positions[pid] = self.name_index.add(place, names)
+        self.fuzzy_index.add(pid, names)
+        self.modified_index.add(pid, place_modified(place))
+        point = place_point(place)
+        if point is not None:
+            self.spatial_index.add(pid, point)
+        spans = place_periods(place)
+        if spans:
+            self.period_index.add(pid, spans)
+
+    def _remove(self, pid: str):
+        try:
+            del self.places[pid]
+        except KeyError:
+            return
+        self.name_index.remove(self._positions.pop(pid))
+        self.fuzzy_index.remove(pid)
+        self.modified_index.remove(pid)
+        self.spatial_index.remove(pid)
+        self.period_index.remove(pid)
+        self._rendered.pop(pid, None)
+
+    def update(self, places: list, removed=()):
+        """
+        Swap changed places into the brain without rebuilding it.
+
+        Places whose ids are already known replace the old entries; ids in
+        removed are dropped. Answers are never computed against a half
+        applied update.
+        """
+        with self._lock:
+            for pid in removed:
+                self._remove(str(pid))
+            for place in places:
+                self._remove(place_id(place))
+                self._add(place)
+            self.answer_cache.clear()
+            self._latest_rendered = None
+        logger.info(
+            'brain updated: {} places changed, {} removed'.format(
+                len(places), len(removed)))
 
     def answer(self, question):
+        start = perf_counter()
         clean_question = self._clean(question)
-        logger.debug('clean_question: "{}"'.format(clean_question))
-
-        if ('superluminal' in clean_question or
-                'beamship' in clean_question or
-                'phase conjugate' in clean_question or
-                'reverse time travel' in clean_question or
-                'ophanim' in clean_question or
-                'wingmakers' in clean_question or
-                'starseed' in clean_question or
-                'golden ratio' in clean_question):
-            return self._do_answer_superluminal()
+        # lazy arguments: nothing is formatted unless DEBUG is on
+        logger.debug('clean_question: "%s"', clean_question)
+        with self._lock:
+            planned = self.answer_cache.get(clean_question)
+            cached = planned is not None
+            if not cached:
+                planned = self._plan(clean_question)
+                self.answer_cache.put(clean_question, planned)
+        # rendering happens per request, so random choices stay random
+        handler, (renderer, args) = planned
+        answers = getattr(self, renderer)(*args)
+        if self.metrics is not None:
+            self.metrics.histogram(
+                'brain_answer_seconds',
+                'Brain.answer time by directive handler').observe(
+                    perf_counter() - start, handler=handler)
+            self.metrics.counter(
+                'brain_answer_cache_total',
+                'answer cache lookups by outcome').inc(
+                    outcome='hit' if cached else 'miss')
+        return answers
+
+    def _plan(self, clean_question):
+        """Return (handler name, (renderer, args)) for a question."""
+        if superluminal_matcher.search(clean_question) is not None:
+            return ('superluminal', ('_do_answer_superluminal', ()))
         if ' ' not in clean_question:
             if clean_question == 'ping':
-                return ['pong']
+                return ('ping', ('_render_static', (['pong'],)))
             else:
                 try:
                     pid = int(clean_question)
@@ -131,67 +341,92 @@ class Brain:
                     pass
                 else:
                     if str(pid) == clean_question:
-                        return self._do_answer_pid([clean_question])
-        for key, directive in directives.items():
-            logger.debug('directive key: {}'.format(key))
-            for trigger in directive['triggers']:
-                logger.debug('trigger: {}'.format(trigger))
-                if trigger in clean_question:
-                    for matcher in directive['matchers']:
-                        logger.debug('matcher: {}'.format(matcher.pattern))
-                        m = matcher.match(clean_question)
-                        if m is not None:
-                            logger.debug('match')
-                            try:
-                                tokens = m.group('tokens').split()
-                            except IndexError:
-                                tokens = []
-                            return getattr(
-                                self,
-                                '_do_answer_{}'.format(
-                                    directive['handler']))(tokens)
-                        else:
-                            logger.debug('miss')
+                        return ('pid', self._plan_pid([clean_question]))
+        route = dispatch(clean_question)
+        if route is not None:
+            handler, tokens = route
+            logger.debug('handler: %s', handler)
+            return (
+                handler, getattr(self, '_plan_{}'.format(handler))(tokens))
 #        for trigger in triggers:
 #            clean_question = clean_question.replace(trigger, '')
-        answer = self._do_answer_named([clean_question])
-        if len(answer) == 0:
-            answer = self._do_answer_named(clean_question.split())
-        return answer
+        plan = self._plan_named([clean_question], fuzzy=False)
+        if len(plan[1][1]) == 0:
+            plan = self._plan_named(clean_question.split())
+        return ('fallback', plan)
 
     def _do_answer_superluminal(self):
-        superfluities = [
-            'Sterope', 'Merope', 'Electra', 'Maia', 'Taygeta', 'Celaeno',
-            'Alcyone', 'Atlas', 'Pleione', 'Eta (25) Tauri', '27 Tauri',
-            '17 Tauri', '20 Tauri', '23 Tauri', '19 Tauri', '28 (BU) Tauri',
-            '16 Tauri', 'Asterope', '21 Tauri', '22 Tauri', '18 Tauri',
-            'Seven Sisters', 'Messier 45', 'Atlantides', 'Vergiliae',
-            'Matariki', 'Krittika', 'Thurayya', 'MULMUL', 'Mutsuraboshi',
-            'Subaru', '1610', 'Con†Stellation', 'NASFA',
-            'https://en.wikipedia.org/wiki/Pleiades',
-            'https://scaife.perseus.org/search/?kind=form&p=3&q=pleiades',
-            'https://scaife.perseus.org/search/?q=%CE%A0%CE%BB%CE%B5%CE%B9%CE%AC%CE%B4%CE%B5%CF%82&kind=lemma'
-            ]
-        fonts = ['1row', '3-d', '3d_diagonal', '3x5', '4max', '4x4_offr', '5lineoblique', '5x7', '5x8', '64f1____', '6x10', '6x9', 'B1FF', 'DANC4', 'ICL-1900', 'a_zooloo', 'acrobatic', 'advenger', 'alligator', 'alligator2', 'alligator3', 'alpha', 'alphabet', 'amc3line', 'amc3liv1', 'amcaaa01', 'amcneko', 'amcrazo2', 'amcrazor', 'amcslash', 'amcslder', 'amcthin', 'amctubes', 'amcun1', 'aquaplan', 'arrows', 'asc_____', 'ascii9', 'ascii___', 'ascii_new_roman', 'assalt_m', 'asslt__m', 'atc_____', 'atc_gran', 'avatar', 'b_m__200', 'banner', 'banner3-D', 'banner3', 'banner4', 'barbwire', 'basic', 'battle_s', 'battlesh', 'baz__bil', 'bear', 'beer_pub', 'bell', 'benjamin', 'big', 'bigascii12', 'bigascii9', 'bigchief', 'bigfig', 'bigmono12', 'bigmono9', 'binary', 'block', 'blocks', 'bolger', 'braced', 'bright', 'brite', 'briteb', 'britebi', 'britei', 'broadway', 'broadway_kb', 'bubble', 'bubble__', 'bubble_b', 'bulbhead', 'c1______', 'c2______', 'c_ascii_', 'c_consen', 'calgphy2', 'caligraphy', 'cards', 'catwalk', 'caus_in_', 'char1___', 'char2___', 'char3___', 'char4___', 'charact1', 'charact2', 'charact3', 'charact4', 'charact5', 'charact6', 'characte', 'charset_', 'chartr', 'chartri', 'chiseled', 'chunky', 'circle', 'clb6x10', 'clb8x10', 'clb8x8', 'cli8x8', 'clr4x6', 'clr5x10', 'clr5x6', 'clr5x8', 'clr6x10', 'clr6x6', 'clr6x8', 'clr7x10', 'clr7x8', 'clr8x10', 'clr8x8', 'coil_cop', 'coinstak', 'cola', 'colossal', 'com_sen_', 'computer', 'contessa', 'contrast', 'convoy__', 'cosmic', 'cosmike', 'cour', 'courb', 'courbi', 'couri', 'crawford', 'crazy', 'cricket', 'cursive', 'cyberlarge', 'cybermedium', 'cybersmall', 'cygnet', 'd_dragon', 'dancingfont', 'dcs_bfmo', 'decimal', 'deep_str', 'defleppard', 'demo_1__', 'demo_2__', 'demo_m__', 'devilish', 'diamond', 'dietcola', 'digital', 'doh', 'doom', 'dosrebel', 'dotmatrix', 'double', 'doubleshorts', 'drpepper', 'druid___', 'dwhistled', 'e__fist_', 'ebbs_1__', 'ebbs_2__', 'eca_____', 'eftichess', 'eftifont', 'eftipiti', 'eftirobot', 'eftitalic', 'eftiwall', 'eftiwater', 'emboss', 'emboss2', 'epic', 'etcrvs__', 'f15_____', 'faces_of', 'fair_mea', 'fairligh', 'fantasy_', 'fbr12___', 'fbr1____', 'fbr2____', 'fbr_stri', 'fbr_tilt', 'fender', 'filter', 'finalass', 'fire_font-k', 'fire_font-s', 'fireing_', 'flipped', 'flowerpower', 'flyn_sh', 'fourtops', 'fp1_____', 'fp2_____', 'fraktur', 'funface', 'funfaces', 'funky_dr', 'future', 'future_1', 'future_2', 'future_3', 'future_4', 'future_5', 'future_6', 'future_7', 'future_8', 'fuzzy', 'gauntlet', 'georgi16', 'georgia11.flf ', 'ghost', 'ghost_bo', 'ghoulish', 'glenyn', 'goofy', 'gothic', 'gothic__', 'graceful', 'gradient', 'graffiti', 'grand_pr', 'greek', 'green_be', 'hades___', 'heart_left', 'heart_right', 'heavy_me', 'helv', 'helvb', 'helvbi', 'helvi', 'henry3d', 'heroboti', 'hex', 'hieroglyphs', 'high_noo', 'hills___', 'hollywood', 'home_pak', 'horizontalleft', 'horizontalright', 'house_of', 'hypa_bal', 'hyper___', 'impossible', 'inc_raw_', 'invita', 'isometric1', 'isometric2', 'isometric3', 'isometric4', 'italic', 'italics_', 'ivrit', 'jacky', 'jazmine', 'jerusalem', 'joust___', 'katakana', 'kban', 'keyboard', 'kgames_i', 'kik_star', 'knob', 'konto', 'kontoslant', 'krak_out', 'larry3d', 'lazy_jon', 'lcd', 'lean', 'letter', 'letter_w', 'letters', 'letterw3', 'lexible_', 'lildevil', 'lineblocks', 'linux', 'lockergnome', 'mad_nurs', 'madrid', 'magic_ma', 'marquee', 'master_o', 'maxfour', 'mayhem_d', 'mcg_____', 'merlin1', 'merlin2', 'mig_ally', 'mike', 'mini', 'mirror', 'mnemonic', 'modern__', 'modular', 'mono12', 'mono9', 'morse', 'morse2', 'moscow', 'mshebrew210', 'muzzle', 'nancyj-fancy', 'nancyj-improved', 'nancyj-underlined', 'nancyj', 'new_asci', 'nfi1____', 'nipples', 'notie_ca', 'npn_____', 'nscript', 'ntgreek', 'nvscript', 'o8', 'octal', 'odel_lak', 'ogre', 'ok_beer_', 'oldbanner', 'os2', 'outrun__', 'p_s_h_m_', 'p_skateb', 'pacos_pe', 'pagga', 'panther_', 'pawn_ins', 'pawp', 'peaks', 'peaksslant', 'pebbles', 'pepper', 'phonix__', 'platoon2', 'platoon_', 'pod_____', 'poison', 'puffy', 'puzzle', 'pyramid', 'r2-d2___', 'rad_____', 'rad_phan', 'radical_', 'rainbow_', 'rally_s2', 'rally_sp', 'rammstein', 'rampage_', 'rastan__', 'raw_recu', 'rci_____', 'rectangles', 'red_phoenix', 'relief', 'relief2', 'rev', 'reverse', 'ripper!_', 'road_rai', 'rockbox_', 'rok_____', 'roman', 'roman___', 'rot13', 'rot13', 'rotated', 'rounded', 'rowancap', 'rozzo', 'runic', 'runyc', 's-relief', 'sans', 'sansb', 'sansbi', 'sansi', 'santaclara', 'sblood', 'sbook', 'sbookb', 'sbookbi', 'sbooki', 'script', 'script__', 'serifcap', 'shadow', 'shimrod', 'short', 'skate_ro', 'skateord', 'skateroc', 'sketch_s', 'slant', 'slide', 'slscript', 'sm______', 'small', 'smallcaps', 'smascii9', 'smblock', 'smbraille', 'smisome1', 'smkeyboard', 'smmono12', 'smmono9', 'smpoison', 'smscript', 'smshadow', 'smslant', 'smtengwar', 'soft', 'space_op', 'spc_demo', 'speed', 'spliff', 'stacey', 'stampate', 'stampatello', 'standard', 'star_war', 'starstrips', 'starwars', 'stealth_', 'stellar', 'stencil1', 'stencil2', 'stforek', 'stop', 'straight', 'street_s', 'sub-zero', 'subteran', 'super_te', 'swampland', 'swan', 'sweet', 't__of_ap', 'tanja', 'tav1____', 'taxi____', 'tec1____', 'tec_7000', 'tecrvs__', 'tengwar', 'term', 'test1', 'thick', 'thin', 'threepoint', 'ti_pan__', 'ticks', 'ticksslant', 'tiles', 'times', 'timesofl', 'tinker-toy', 'tomahawk', 'tombstone', 'top_duck', 'train', 'trashman', 'trek', 'triad_st', 'ts1_____', 'tsalagi', 'tsm_____', 'tsn_base', 'tty', 'ttyb', 'tubular', 'twin_cob', 'twisted', 'twopoint', 'type_set', 'ucf_fan_', 'ugalympi', 'unarmed_', 'univers', 'upper', 'usa_____', 'usa_pq__', 'usaflag', 'utopia', 'utopiab', 'utopiabi', 'utopiai', 'varsity', 'vortron_', 'war_of_w', 'wavy', 'weird', 'wetletter', 'whimsy', 'wideterm', 'wow', 'xbrite', 'xbriteb', 'xbritebi', 'xbritei', 'xchartr', 'xchartri', 'xcour', 'xcourb', 'xcourbi', 'xcouri', 'xhelv', 'xhelvb', 'xhelvbi', 'xhelvi', 'xsans', 'xsansb', 'xsansbi', 'xsansi', 'xsbook', 'xsbookb', 'xsbookbi', 'xsbooki', 'xtimes', 'xtty', 'xttyb', 'yie-ar__', 'yie_ar_k', 'z-pilot_', 'zig_zag_', 'zone7___']
-        i = random.randint(0, len(superfluities)-1)
-        s = superfluities[i]
-        if 'http' in s:
-            return [s]
+        return [self.superluminal.pick()]
+
+    def _plan_age(self, tokens: list):
+        span = parse_span(tokens)
+        if span is not None:
+            results = self._find_active(span)
+            # the hint must be a question list_age parses: "list in 300 bc"
+            trigger = 'list' if tokens[0] in AT + FROM else 'list in'
+            return ('_handle_multiples', (trigger, results, tokens))
+        if len(tokens) == 1 and tokens[0] in self.places:
+            results = [self.places[tokens[0]]]
         else:
-            j = random.randint(0, len(fonts)-1)
-            try:
-                f = Figlet(font=fonts[j])
-            except FontNotFound:
-                f = Figlet(font='block')
-            return [f.renderText(s)]
+            results = self._find_named(tokens)
+        return ('_render_age', (results[:1],))
 
-    def _do_answer_age(self, tokens: list):
-        return ["Sorry, I can't do time-period answers yet."]
+    def _plan_list_age(self, tokens: list):
+        span = parse_span(tokens)
+        results = [] if span is None else self._find_active(span)
+        return ('_render_all', (results,))
 
-    def _do_answer_listing_latest(self, tokens: list):
+    def _find_active(self, span: tuple):
+        return [
+            self.places[pid] for pid in self.period_index.overlapping(*span)]
+
+    def _render_age(self, results: list):
+        answers = []
+        for place in results:
+            spans = self.period_index.spans.get(place_id(place))
+            names = place_names(place)
+            title = names[0] if names else place_id(place)
+            if spans:
+                when = '{} was active from {}.'.format(
+                    title, format_spans(spans))
+            else:
+                when = "I don't know when {} was active.".format(title)
+            answers.append('\n\n'.join((when, self._render_place(place))))
+        return answers
+
+    def _plan_listing_latest(self, tokens: list):
         # NB: tokens are ignored
-        results = self.place_collection.get('last_modified')
-        return [str(r) for r in results]
+        return ('_render_latest', ())
+
+    def _latest(self):
+        return [
+            self.places[pid]
+            for pid in self.modified_index.latest(self.latest_count)]
+
+    def _render_latest(self):
+        with self._lock:
+            if self._latest_rendered is None:
+                self._latest_rendered = self._render_all(self._latest())
+            return list(self._latest_rendered)
+
+    def _render_static(self, answers: list):
+        return list(answers)
+
+    def _render_all(self, results: list):
+        return [self._render_place(r) for r in results]
+
+    def _render_place(self, place):
+        pid = place_id(place)
+        try:
+            known, rendered = self._rendered[pid]
+        except KeyError:
+            known = None
+        if known is not place:
+            # a plan from before an update may still hold the old place
+            rendered = str(place)
+            if self.places.get(pid) is place:
+                self._rendered[pid] = (place, rendered)
+        return rendered
 
     def _handle_multiples(self, trigger: str, results: list, tokens: list):
         if len(results) > 1:
@@ -202,55 +437,117 @@ class Brain:
             postfix = (
                 'For all matches, reply with "{} {}"'.format(
                     trigger, ' '.join(tokens))).strip()
-            answer = ['\n\n'.join((prefix, str(results[i]), postfix))]
+            answer = ['\n\n'.join(
+                (prefix, self._render_place(results[i]), postfix))]
         else:
-            answer = [str(r) for r in results]
+            answer = self._render_all(results)
         logger.debug(answer)
         return answer
 
-    def _generate_name_candidates(self, tokens: list):
-        if len(tokens) == 1:
-            candidates = tokens
-        else:
-            candidates = [' '.join(t) for t in list(permutations(tokens))]
-        return candidates
+    def _find_named(self, tokens: list, fuzzy=True):
+        results = self.name_index.search(tokens)
+        if not results and fuzzy:
+            results = [
+                self.places[pid]
+                for pid in self.fuzzy_index.search(' '.join(tokens))]
+        return results
 
-    def _do_answer_named(self, tokens: list):
-        results = []
-        candidates = self._generate_name_candidates(tokens)
-        for candidate in candidates:
-            results.extend(self.place_collection.get('name', candidate))
-            results.extend(self.place_collection.get('in_name', candidate))
-        results = list(set(results))
-        logger.debug('{} results in hand'.format(len(results)))
-        return self._handle_multiples('list named', results, tokens)
-
-    def _do_answer_list_named(self, tokens: list):
-        results = []
-        candidates = self._generate_name_candidates(tokens)
-        for candidate in candidates:
-            results.extend(self.place_collection.get('name', candidate))
-            results.extend(self.place_collection.get('in_name', candidate))
-        results = list(set(results))
-        return [str(r) for r in results]
-
-    def _do_answer_pid(self, tokens: list):
+    def _plan_named(self, tokens: list, fuzzy=True):
+        results = self._find_named(tokens, fuzzy)
+        logger.debug('%d results in hand', len(results))
+        return ('_handle_multiples', ('list named', results, tokens))
+
+    def _plan_list_named(self, tokens: list):
+        results = self._find_named(tokens)
+        return ('_render_all', (results,))
+
+    def _find_pids(self, tokens: list):
         results = []
         for token in tokens:
-            results.extend(self.place_collection.get('id', token))
-        return self._handle_multiples('list pid', results, tokens)
+            try:
+                results.append(self.places[token])
+            except KeyError:
+                pass
+        return results
 
-    def _do_answer_most_recent(self, tokens: list):
-        # NB: tokens are ignored
-        results = self.place_collection.get('last_modified')
-        return self._handle_multiples('list latest', results, [])
+    def _plan_pid(self, tokens: list):
+        results = self._find_pids(tokens)
+        return ('_handle_multiples', ('list pid', results, tokens))
+
+    def _plan_list_pid(self, tokens: list):
+        return ('_render_all', (self._find_pids(tokens),))
+
+    def _find_near(self, tokens: list):
+        """
+        Places near a "latitude longitude" pair, a pid or a place name.
+
+        A trailing "within N km" asks for every place in that radius rather
+        than the nearest near_count.
+        """
+        km = None
+        if len(tokens) > 3 and tokens[-3] == 'within' and tokens[-1] in [
+                'km', 'kilometers', 'kilometres']:
+            try:
+                km = float(tokens[-2])
+            except ValueError:
+                pass
+            else:
+                tokens = tokens[:-3]
+        origin = None
+        exclude = ()
+        if len(tokens) == 2:
+            try:
+                latitude, longitude = float(tokens[0]), float(tokens[1])
+            except ValueError:
+                pass
+            else:
+                if abs(latitude) <= 90 and abs(longitude) <= 180:
+                    origin = (latitude, longitude)
+        if origin is None:
+            if len(tokens) == 1 and tokens[0] in self.places:
+                candidates = [self.places[tokens[0]]]
+            else:
+                candidates = self._find_named(tokens)
+            for place in candidates:
+                origin = place_point(place)
+                if origin is not None:
+                    exclude = (place_id(place),)
+                    break
+        if origin is None:
+            return []
+        if km is None:
+            found = self.spatial_index.nearest(
+                origin, self.near_count, exclude)
+        else:
+            found = self.spatial_index.within(origin, km, exclude)
+        return [self.places[pid] for distance, pid in found]
+
+    def _plan_near(self, tokens: list):
+        results = self._find_near(tokens)
+        return ('_handle_multiples', ('list near', results, tokens))
+
+    def _plan_list_near(self, tokens: list):
+        return ('_render_all', (self._find_near(tokens),))
+
+    def _plan_most_recent(self, tokens: list):
+        # NB: tokens are ignored; only "list latest" answers with k places
+        results = [self.places[pid] for pid in self.modified_index.newest()]
+        return ('_handle_multiples', ('list latest', results, []))
 
     def _clean(self, raw):
+        cooked = NUMBER.sub(
+            lambda m: m.group().replace('-', MINUS_SIGN).replace(
+                '.', DECIMAL_POINT), raw)
+        cooked = self._normalize(cooked)
+        cooked = cooked.replace(MINUS_SIGN, '-').replace(DECIMAL_POINT, '.')
+        cooked = ' '.join([c for c in cooked.split() if c not in IGNORE])
+        return cooked
+
+    def _normalize(self, raw):
         cooked = raw
         cooked = textnorm.normalize_space(cooked)
         cooked = textnorm.normalize_unicode(cooked, 'NFD')
         cooked = cooked.translate(punct_table)
         cooked = textnorm.normalize_unicode(cooked, 'NFC')
         cooked = cooked.lower()
-        cooked = ' '.join([c for c in cooked.split() if c not in IGNORE])
         return cooked
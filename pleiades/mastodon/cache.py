@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bounded LRU/TTL cache for brain answers
+"""
+
+from collections import OrderedDict
+import logging
+import time
+
+DEFAULT_ANSWER_CACHE_SIZE = 1024
+logger = logging.getLogger(__name__)
+
+
+class AnswerCache:
+    """
+    Least-recently-used mapping with optional time-to-live.
+
+    A maxsize of 0 disables caching; a ttl of None keeps entries until
+    they are evicted or the cache is cleared. hits and misses count
+    lookups since the cache was created.
+    """
+
+    def __init__(self, maxsize=DEFAULT_ANSWER_CACHE_SIZE, ttl=None,
+                 clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        try:
+            stored, value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if self.ttl is not None and self.clock() - stored > self.ttl:
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = (self.clock(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {
+            'size': len(self.entries), 'maxsize': self.maxsize,
+            'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Crash-safe record of how far the bot has read and what it has answered
+"""
+
+import logging
+import os
+from os.path import abspath, dirname
+import time
+
+DEFAULT_CHECKPOINT_PATH = os.path.join('data', 'since_id.txt')
+DEFAULT_FLUSH_EVERY = 20
+DEFAULT_FLUSH_INTERVAL = 30.0
+logger = logging.getLogger(__name__)
+
+
+def newer(a: str, b):
+    """True if notification id a comes after b (None comes before all)."""
+    if b is None:
+        return True
+    a, b = str(a), str(b)
+    if a.isdigit() and b.isdigit():
+        return int(a) > int(b)
+    return (len(a), a) > (len(b), b)
+
+
+def _sync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class Checkpoint:
+    """
+    The since_id to poll from, plus a journal of the mentions answered.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH,
+                 flush_every=DEFAULT_FLUSH_EVERY,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, clock=time.monotonic):
+        self.path = path
+        self.journal_path = None if path is None else '{}.journal'.format(
+            path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.since_id = None
+        self.answered = set()
+        self._unsaved = 0
+        self._saved_at = clock()
+        self._journal = None
+
+    def load(self):
+        """Read the checkpoint and journal; return since_id."""
+        if self.path is None:
+            return self.since_id
+        with open(self.path, 'r') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        self.since_id = lines[0] if lines else None
+        self.answered = set(lines[1:])
+        try:
+            with open(self.journal_path, 'r') as f:
+                # a torn last line can only be a claim never posted
+                self.answered.update([
+                    line.strip() for line in f if line.endswith('\n')])
+        except FileNotFoundError:
+            pass
+        logger.info(
+            'checkpoint: since_id {}, {} answered mentions'.format(
+                self.since_id, len(self.answered)))
+        return self.since_id
+
+    def is_answered(self, notification_id):
+        return str(notification_id) in self.answered
+
+    def claim(self, notification_id):
+        """Durably record that notification_id is being answered."""
+        notification_id = str(notification_id)
+        self.answered.add(notification_id)
+        if self.path is None:
+            return
+        if self._journal is None:
+            os.makedirs(dirname(abspath(self.journal_path)), exist_ok=True)
+            self._journal = open(self.journal_path, 'a')
+        self._journal.write('{}\n'.format(notification_id))
+        _sync(self._journal)
+
+    def advance(self, notification_id):
+        """Note that everything up to notification_id has been handled."""
+        if newer(notification_id, self.since_id):
+            self.since_id = str(notification_id)
+            self._unsaved += 1
+        self.tick()
+
+    def tick(self):
+        """Write the checkpoint if enough has changed or time has passed."""
+        if self._unsaved and (
+                self._unsaved >= self.flush_every or
+                self.clock() - self._saved_at >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Replace the checkpoint whole: write, sync, rename over the old."""
+        if self.path is None or self.since_id is None:
+            self._unsaved = 0
+            return
+        # claims at or before since_id will never be fetched again
+        self.answered = {
+            a for a in self.answered if newer(a, self.since_id)}
+        path = abspath(self.path)
+        os.makedirs(dirname(path), exist_ok=True)
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join([self.since_id] + sorted(self.answered)))
+            f.write('\n')
+            _sync(f)
+        os.replace(tmp_path, path)
+        self._sync_directory(path)
+        # everything in the journal is now in the checkpoint
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            open(self.journal_path, 'w').close()
+        self._unsaved = 0
+        self._saved_at = self.clock()
+        logger.debug('checkpoint written at since_id {}'.format(
+            self.since_id))
+
+    def _sync_directory(self, path: str):
+        try:
+            fd = os.open(dirname(path), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pull the question out of a status's HTML
+"""
+
+from html.parser import HTMLParser
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _is_tag_link(attrs: list):
+    """True for the anchors Mastodon wraps mentions and hashtags in."""
+    attrs = dict(attrs)
+    classes = (attrs.get('class') or '').split()
+    rels = (attrs.get('rel') or '').split()
+    return 'mention' in classes or 'hashtag' in classes or 'tag' in rels
+
+
+class QueryExtractor(HTMLParser):
+    """
+    Collect a status's text, leaving out mention and hashtag links.
+
+    Text is joined exactly as BeautifulSoup's get_text() would join it
+    (tags add nothing, not even <br> or </p>), so a status with no links
+    reads the same as it did through a full parse.
+    """
+
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.parts = []
+        self.skipping = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a' and _is_tag_link(attrs):
+            self.skipping = True
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self.skipping = False
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def text(self):
+        return ''.join(self.parts)
+
+
+def extract_query(html: str):
+    """The words of a status, without mentions or hashtags."""
+    extractor = QueryExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return ' '.join(extractor.text().split())
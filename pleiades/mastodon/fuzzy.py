@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Approximate, transliteration-tolerant name lookup
+"""
+
+from collections import defaultdict
+import logging
+import unicodedata
+
+DEFAULT_MAX_EDITS = 1
+MIN_FUZZY_LENGTH = 4    # shorter queries are too ambiguous to guess at
+ONE_EDIT_LENGTH = 8     # below this, a second edit matches too much
+GREEK = {
+    'α': 'a', 'β': 'b', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'e',
+    'θ': 'th', 'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'x',
+    'ο': 'o', 'π': 'p', 'ρ': 'r', 'σ': 's', 'ς': 's', 'τ': 't', 'υ': 'y',
+    'φ': 'ph', 'χ': 'ch', 'ψ': 'ps', 'ω': 'o'}
+# Greek and Latin spellings of the same name, collapsed to one form
+VARIANTS = [
+    ('ph', 'f'), ('th', 't'), ('ch', 'c'), ('rh', 'r'), ('k', 'c'),
+    ('ae', 'e'), ('ai', 'e'), ('oe', 'e'), ('oi', 'e'), ('ei', 'i'),
+    ('ou', 'u'), ('y', 'i'), ('j', 'i'), ('v', 'u')]
+logger = logging.getLogger(__name__)
+
+
+def fold(normalized: str):
+    """Strip accents and fold Greek and Latin spellings together."""
+    decomposed = unicodedata.normalize('NFD', normalized)
+    folded = ''.join([
+        GREEK.get(c, c) for c in decomposed
+        if not unicodedata.combining(c)])
+    for old, new in VARIANTS:
+        folded = folded.replace(old, new)
+    return folded
+
+
+def _grams(key: str):
+    padded = '$${}$'.format(key)
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int):
+    """Levenshtein distance, or limit + 1 once it must exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # only cells within limit of the diagonal can stay within limit
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+class FuzzyIndex:
+    """
+    Trigram index over folded names and name words.
+
+    A key within k edits of the query shares all but at most 3k of the
+    query's trigrams, so it must contain at least one of the query's 3k+1
+    rarest trigrams. Only keys found that way are counted and then checked
+    with a bounded edit distance, which keeps lookups well clear of a scan
+    of the gazetteer.
+    """
+
+    def __init__(self, normalize, max_edits=DEFAULT_MAX_EDITS):
+        self.normalize = normalize
+        self.max_edits = max_edits
+        self.keys = defaultdict(set)    # folded key -> pids
+        self.grams = {}                 # trigram -> key length -> keys
+        self.pid_keys = {}              # pid -> folded keys
+
+    def _keys_for(self, names: list):
+        keys = set()
+        for name in names:
+            words = fold(self.normalize(name)).split()
+            if not words:
+                continue
+            keys.add(' '.join(words))
+            if len(words) > 1:
+                keys.update(words)
+        return keys
+
+    def add(self, pid: str, names: list):
+        keys = self._keys_for(names)
+        self.pid_keys[pid] = keys
+        for key in keys:
+            if not self.keys[key]:
+                for gram in _grams(key):
+                    self.grams.setdefault(gram, {}).setdefault(
+                        len(key), set()).add(key)
+            self.keys[key].add(pid)
+
+    def remove(self, pid: str):
+        for key in self.pid_keys.pop(pid, ()):
+            pids = self.keys[key]
+            pids.discard(pid)
+            if not pids:
+                del self.keys[key]
+                for gram in _grams(key):
+                    lengths = self.grams[gram]
+                    lengths[len(key)].discard(key)
+                    if not lengths[len(key)]:
+                        del lengths[len(key)]
+                    if not lengths:
+                        del self.grams[gram]
+
+    def search(self, query: str, max_edits=None):
+        """Return pids of approximately matching places, closest first."""
+        if max_edits is None:
+            max_edits = self.max_edits
+        key = ' '.join(fold(self.normalize(query)).split())
+        if len(key) < MIN_FUZZY_LENGTH:
+            return []
+        if len(key) < ONE_EDIT_LENGTH:
+            max_edits = min(max_edits, 1)
+        if max_edits <= 0:
+            return []
+        lengths = range(len(key) - max_edits, len(key) + max_edits + 1)
+        grams = _grams(key)
+        postings = {}
+        for gram in grams:
+            by_length = self.grams.get(gram, {})
+            postings[gram] = [
+                by_length[n] for n in lengths if n in by_length]
+        rare = sorted(
+            grams, key=lambda g: sum([len(keys) for keys in postings[g]]))
+        candidates = set()
+        for gram in rare[:3 * max_edits + 1]:
+            for keys in postings[gram]:
+                candidates.update(keys)
+        needed = len(grams) - 3 * max_edits
+        ranked = []
+        for candidate in candidates:
+            shared = len(grams & _grams(candidate))
+            if shared < needed:
+                continue
+            distance = edit_distance(key, candidate, max_edits)
+            if distance <= max_edits:
+                ranked.append((distance, -shared, candidate))
+        ranked.sort()
+        pids = []
+        seen = set()
+        for distance, shared, candidate in ranked:
+            for pid in sorted(self.keys[candidate]):
+                if pid not in seen:
+                    seen.add(pid)
+                    pids.append(pid)
+        return pids
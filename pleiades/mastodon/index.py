@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token-indexed name lookup for the brain
+"""
+
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import permutations
+import logging
+from pleiades.mastodon.places import place_names
+
+logger = logging.getLogger(__name__)
+
+# ranks, best first
+EXACT_PHRASE = 0
+EXACT_PERMUTATION = 1
+WORD_ADJACENT = 2
+SUBSTRING_ADJACENT = 3
+
+
+def _trigrams(word: str):
+    return {word[i:i+3] for i in range(len(word) - 2)}
+
+
+class NameIndex:
+    """
+    Inverted index from normalized name words to place positions.
+
+    A query matches a place when some ordering of its tokens, joined with
+    single spaces, occurs within one of the place's normalized names. This
+    is the same rule as looking up every token permutation with the
+    collection's 'name' and 'in_name' keys, but candidates come from
+    intersecting posting lists and are checked by phrase adjacency, so the
+    cost no longer grows with the factorial of the token count.
+
+    Positions freed by remove() are handed out again by add(), so hot
+    reloads replace places in place rather than growing the index.
+    """
+
+    def __init__(self, places, normalize):
+        self.normalize = normalize
+        self.places = []        # position -> place
+        self.names = []         # position -> list of name word lists
+        self.postings = {}      # name word -> set of positions
+        self.grams = {}         # trigram -> set of name words
+        self.free = []          # positions of removed places, for reuse
+        self.live = 0
+        for place in places:
+            self.add(place)
+        logger.debug(
+            'indexed {} name words for {} places'.format(
+                len(self.postings), len(self.places)))
+
+    def add(self, place, names=None):
+        if names is None:
+            names = place_names(place)
+        if self.free:
+            position = self.free.pop()
+            self.places[position] = place
+        else:
+            position = len(self.places)
+            self.places.append(place)
+            self.names.append([])
+        self.live += 1
+        normalized = []
+        for name in names:
+            words = self.normalize(name).split()
+            if not words:
+                continue
+            normalized.append(words)
+            for word in words:
+                try:
+                    self.postings[word].add(position)
+                except KeyError:
+                    self.postings[word] = {position}
+                    for gram in _trigrams(word):
+                        self.grams.setdefault(gram, set()).add(word)
+        self.names[position] = normalized
+        return position
+
+    def remove(self, position: int):
+        if self.places[position] is None:
+            return
+        for words in self.names[position]:
+            for word in words:
+                found = self.postings.get(word)
+                if found is None:
+                    continue
+                found.discard(position)
+                if not found:
+                    del self.postings[word]
+                    for gram in _trigrams(word):
+                        self.grams[gram].discard(word)
+                        if not self.grams[gram]:
+                            del self.grams[gram]
+        self.places[position] = None
+        self.names[position] = []
+        self.free.append(position)
+        self.live -= 1
+
+    def __len__(self):
+        return self.live
+
+    def _vocabulary_containing(self, fragment: str):
+        if len(fragment) < 3:
+            return [w for w in self.postings if fragment in w]
+        words = None
+        for gram in _trigrams(fragment):
+            try:
+                found = self.grams[gram]
+            except KeyError:
+                return []
+            words = found if words is None else words & found
+            if not words:
+                return []
+        return [w for w in words if fragment in w]
+
+    def _positions_containing(self, fragment: str):
+        positions = set()
+        for word in self._vocabulary_containing(fragment):
+            positions.update(self.postings[word])
+        return positions
+
+    def search(self, tokens: list):
+        """Return matching places, best phrase adjacency first."""
+        words = [w for t in tokens for w in t.split()]
+        if not words:
+            # the empty phrase occurs in every name
+            return [p for p, n in zip(self.places, self.names) if n]
+        candidates = None
+        for word in sorted(set(words), key=len, reverse=True):
+            found = self._positions_containing(word)
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return []
+        ranked = []
+        for position in candidates:
+            rank = self._rank(tokens, self.names[position])
+            if rank is not None:
+                ranked.append((rank, position))
+        ranked.sort()
+        return [self.places[position] for rank, position in ranked]
+
+    def _rank(self, tokens: list, names: list):
+        best = None
+        if len(tokens) == 1 or any(' ' in t for t in tokens):
+            phrases = [tokens] if len(tokens) == 1 else None
+            for words in names:
+                rank = self._rank_phrase(tokens, words, phrases)
+                if rank is not None and (best is None or rank < best):
+                    best = rank
+            return best
+        for words in names:
+            rank = self._rank_tokens(tokens, words)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return best
+
+    def _rank_phrase(self, tokens: list, words: list, phrases):
+        # tokens containing spaces must stay contiguous, so fall back to
+        # checking whole orderings; this only arises for single tokens
+        # (the whole cleaned question) in practice
+        if phrases is None:
+            phrases = permutations(tokens)
+        name = ' '.join(words)
+        best = None
+        for i, phrase in enumerate(phrases):
+            phrase = ' '.join(phrase)
+            if phrase == name:
+                rank = EXACT_PHRASE if i == 0 else EXACT_PERMUTATION
+            elif phrase in name:
+                if ' {} '.format(phrase) in ' {} '.format(name):
+                    rank = WORD_ADJACENT
+                else:
+                    rank = SUBSTRING_ADJACENT
+            else:
+                continue
+            if best is None or rank < best:
+                best = rank
+        return best
+
+    def _rank_tokens(self, tokens: list, words: list):
+        # some ordering t1..tk occurs in the name iff there is a run of k
+        # consecutive words where t1 ends the first, tk starts the last and
+        # the remaining tokens are exactly the words in between
+        k = len(tokens)
+        if k > len(words):
+            return None
+        if k == len(words) and tokens == words:
+            return EXACT_PHRASE
+        wanted = Counter(tokens)
+        best = None
+        for start in range(len(words) - k + 1):
+            window = words[start:start + k]
+            if Counter(window) == wanted:
+                rank = EXACT_PERMUTATION if k == len(words) else WORD_ADJACENT
+                if best is None or rank < best:
+                    best = rank
+                continue
+            middle = Counter(window[1:-1])
+            for i, first in enumerate(tokens):
+                if not window[0].endswith(first):
+                    continue
+                for j, last in enumerate(tokens):
+                    if i == j or not window[-1].startswith(last):
+                        continue
+                    rest = Counter(
+                        t for n, t in enumerate(tokens) if n not in (i, j))
+                    if rest == middle:
+                        best = SUBSTRING_ADJACENT if best is None else best
+                        break
+                if best is not None:
+                    break
+        return best
+
+
+class ModifiedIndex:
+    """
+    Place ids kept in order of modification, so the most recently
+    modified places are a slice rather than a pass over the collection.
+    """
+
+    def __init__(self):
+        self.order = []         # sorted (modified, pid)
+        self.stamps = {}        # pid -> modified
+
+    def add(self, pid: str, modified: str):
+        self.remove(pid)
+        self.stamps[pid] = modified
+        insort(self.order, (modified, pid))
+
+    def remove(self, pid: str):
+        try:
+            modified = self.stamps.pop(pid)
+        except KeyError:
+            return
+        i = bisect_left(self.order, (modified, pid))
+        del self.order[i]
+
+    def latest(self, count: int):
+        """Return up to count pids, most recently modified first."""
+        return [pid for modified, pid in reversed(self.order[-count:])]
+
+    def newest(self):
+        """Return the pids sharing the latest modification stamp."""
+        if not self.order:
+            return []
+        i = bisect_left(self.order, (self.order[-1][0],))
+        return [pid for modified, pid in reversed(self.order[i:])]
+
+    def __len__(self):
+        return len(self.order)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Counters, histograms and a local Prometheus-style metrics endpoint
+"""
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import threading
+from time import perf_counter
+
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0,
+    30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 40, 80)
+DEFAULT_DUMP_INTERVAL = 60.0
+logger = logging.getLogger(__name__)
+
+
+def _label_text(labels: tuple, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{{{}}}'.format(','.join(
+        ['{}="{}"'.format(k, str(v).replace('"', '\\"')) for k, v in pairs]))
+
+
+class Counter:
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [
+                (self.name, _label_text(key), value)
+                for key, value in sorted(self.values.items())]
+
+    def as_dict(self):
+        with self.lock:
+            return {_label_text(k): v for k, v in self.values.items()}
+
+
+class Histogram:
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}    # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            try:
+                row = self.values[key]
+            except KeyError:
+                row = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, row in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, row):
+                    samples.append((
+                        '{}_bucket'.format(self.name),
+                        _label_text(key, [('le', bound)]), count))
+                samples.append((
+                    '{}_bucket'.format(self.name),
+                    _label_text(key, [('le', '+Inf')]), row[-1]))
+                samples.append((
+                    '{}_sum'.format(self.name), _label_text(key), row[-2]))
+                samples.append((
+                    '{}_count'.format(self.name), _label_text(key), row[-1]))
+        return samples
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                _label_text(k): {'sum': row[-2], 'count': row[-1]}
+                for k, row in self.values.items()}
+
+
+class Registry:
+    """Named metrics, rendered as Prometheus text or as a JSON dict."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help, *args):
+        with self.lock:
+            try:
+                return self.metrics[name]
+            except KeyError:
+                metric = self.metrics[name] = cls(name, help, *args)
+                return metric
+
+    def counter(self, name: str, help: str):
+        return self._get(Counter, name, help)
+
+    def histogram(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    @contextmanager
+    def time(self, name: str, help: str, **labels):
+        """Observe the duration of a with block in a histogram."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name, help).observe(
+                perf_counter() - start, **labels)
+
+    def _items(self):
+        """The metrics, copied under the lock so others can register."""
+        with self.lock:
+            return sorted(self.metrics.items())
+
+    def render(self):
+        lines = []
+        for name, metric in self._items():
+            lines.append('# HELP {} {}'.format(name, metric.help))
+            lines.append('# TYPE {} {}'.format(name, metric.kind))
+            for sample, labels, value in metric.samples():
+                lines.append('{}{} {}'.format(sample, labels, value))
+        return '\n'.join(lines) + '\n'
+
+    def as_dict(self):
+        return {
+            name: metric.as_dict()
+            for name, metric in self._items()}
+
+
+def serve(registry: Registry, port: int, host='127.0.0.1'):
+    """Serve registry.render() at /metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header(
+                'Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True)
+    thread.start()
+    logger.info('serving metrics on http://{}:{}/metrics'.format(host, port))
+    return server
+
+
+class JSONDumper(threading.Thread):
+    """Daemon thread that periodically writes registry.as_dict() to disk."""
+
+    def __init__(self, registry: Registry, path: str,
+                 interval=DEFAULT_DUMP_INTERVAL):
+        threading.Thread.__init__(self, name='metrics-dump', daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        tmp_path = '{}.tmp'.format(self.path)
+        with open(tmp_path, 'w') as f:
+            json.dump(self.registry.as_dict(), f, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Changes to a built index, held aside until it is worth rebuilding
+"""
+
+import logging
+
+OVERLAY_LIMIT = 256     # changes searched linearly before a rebuild
+logger = logging.getLogger(__name__)
+
+
+class Overlay:
+    """
+    Entries added since the last build, and a count of built ones gone.
+
+    Searches scan pending entries directly and skip stale nodes in the
+    built index; once the two together pass limit, rebuild.
+    """
+
+    def __init__(self, limit=OVERLAY_LIMIT):
+        self.limit = limit
+        self.pending = {}   # pid -> entry, not yet in the built index
+        self.stale = 0      # built nodes since removed or replaced
+
+    def add(self, pid: str, entry):
+        self.pending[pid] = entry
+
+    def remove(self, pid: str, nodes=1):
+        """Forget pid, which had nodes in the built index unless pending."""
+        if self.pending.pop(pid, None) is None:
+            self.stale += nodes
+
+    def clear(self):
+        self.pending = {}
+        self.stale = 0
+
+    def full(self):
+        return len(self.pending) + self.stale > self.limit
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pack answer text into as few toots as fit Mastodon's character limit
+"""
+
+from functools import lru_cache
+import logging
+import re
+
+MASTODON_MAX_CHARS = 500
+URL_LENGTH = 23     # Mastodon counts every link as this many characters
+NUMBERING_CHARS = 12    # room for the " 3/10" of a multi-part reply
+MAX_ACCOUNT_CHARS = 30  # longest Mastodon username
+ELLIPSIS = '...'
+PACK_CACHE_SIZE = 4096
+url_pattern = re.compile(r'https?://\S+')
+mention_pattern = re.compile(r'(?<![\w/])(@\w+)@[\w.-]+\w')
+logger = logging.getLogger(__name__)
+
+
+def toot_length(text: str):
+    """Length of text as Mastodon counts it toward the post limit."""
+    if '://' not in text and '@' not in text:
+        return len(text)
+    counted = url_pattern.sub('x' * URL_LENGTH, text)
+    # remote mentions count only the local part of the account
+    counted = mention_pattern.sub(r'\1', counted)
+    return len(counted)
+
+
+def reply_budget(querent: str):
+    """Counted characters left for an answer in a numbered reply."""
+    return MASTODON_MAX_CHARS - NUMBERING_CHARS - toot_length(querent) - 2
+
+
+# an answer this long goes out in one toot whoever asked
+REPLY_MAX_CHARS = reply_budget('@{}'.format('x' * MAX_ACCOUNT_CHARS))
+
+
+class _Full(Exception):
+    """There is more text, but every post allowed is already full."""
+
+
+class _Packer:
+
+    def __init__(self, limit: int, max_parts: int = None):
+        self.limit = limit
+        self.max_parts = max_parts
+        self.posts = []
+        self.pieces = []
+        self.size = 0
+
+    def flush(self):
+        if self.pieces:
+            self.posts.append(''.join(self.pieces))
+        self.pieces = []
+        self.size = 0
+
+    def next_post(self):
+        """Close the open post to start another, if one is allowed."""
+        self.flush()
+        if self.max_parts is not None and len(self.posts) >= self.max_parts:
+            raise _Full()
+
+    def fits(self, sep: str, length: int):
+        if self.pieces:
+            return self.size + len(sep) + length <= self.limit
+        return length <= self.limit
+
+    def put(self, sep: str, text: str, length: int):
+        if self.pieces:
+            self.pieces.append(sep)
+            self.size += len(sep)
+        self.pieces.append(text)
+        self.size += length
+
+    def place(self, sep: str, text: str, length: int):
+        """Add a unit to the open post, or to a fresh one; False if not."""
+        if self.fits(sep, length):
+            self.put(sep, text, length)
+            return True
+        if length <= self.limit:
+            self.next_post()
+            self.put(sep, text, length)
+            return True
+        return False
+
+    def word(self, sep: str, word: str, length: int):
+        if self.place(sep, word, length):
+            return
+        # a single word longer than a whole post: cut it by characters
+        start = 0
+        while start < len(word):
+            if not self.fits(sep, 1):
+                self.next_post()
+            room = self.limit - self.size - (len(sep) if self.pieces else 0)
+            chunk = word[start:start + room]
+            self.put(sep, chunk, len(chunk))
+            start += len(chunk)
+            sep = ''
+
+
+def _measure(text: str):
+    for paragraph in text.split('\n\n'):
+        lines = []
+        for line in paragraph.split('\n'):
+            words = [(w, toot_length(w)) for w in line.split(' ')]
+            length = sum([n for w, n in words]) + len(words) - 1
+            lines.append((line, length, words))
+        length = sum([n for line, n, w in lines]) + len(lines) - 1
+        yield paragraph, length, lines
+
+
+def _ellipsize(post: str, limit: int):
+    """End post with an ellipsis, dropping words until it fits limit."""
+    words = post.rstrip().split(' ')
+    while words and toot_length(' '.join(words)) + len(ELLIPSIS) > limit:
+        words = words[:-1]
+    if not words:
+        return post[:limit - len(ELLIPSIS)] + ELLIPSIS
+    return ' '.join(words).rstrip().rstrip('.') + ELLIPSIS
+
+
+@lru_cache(maxsize=PACK_CACHE_SIZE)
+def pack(text: str, limit: int, max_parts: int = None):
+    """
+    Split text into toots of at most limit counted characters.
+
+    Whole paragraphs are kept together where they fit, then whole lines,
+    then words; only a word longer than a post is cut. Every unit is
+    measured once, so the cost is linear in the length of the text.
+    Given max_parts, text that needs more posts than that is truncated:
+    packing stops once they are full and the last ends in an ellipsis.
+    Results are memoized on (text, limit, max_parts).
+    """
+    if limit <= len(ELLIPSIS):
+        raise ValueError('cannot pack into posts of {} characters'.format(
+            limit))
+    if max_parts is not None and max_parts < 1:
+        raise ValueError('cannot pack into {} posts'.format(max_parts))
+    packer = _Packer(limit, max_parts)
+    try:
+        for paragraph, length, lines in _measure(text):
+            if packer.place('\n\n', paragraph, length):
+                continue
+            sep = '\n\n'
+            for line, length, words in lines:
+                if not packer.place(sep, line, length):
+                    for word, length in words:
+                        packer.word(sep, word, length)
+                        sep = ' '
+                sep = '\n'
+    except _Full:
+        logger.debug('truncated to {} posts'.format(max_parts))
+        packer.posts[-1] = _ellipsize(packer.posts[-1], limit)
+    packer.flush()
+    return tuple(packer.posts)
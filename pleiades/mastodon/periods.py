@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Years, time periods and an interval index over when places were active
+"""
+
+import logging
+from pleiades.mastodon.overlay import Overlay
+
+# Pleiades time period vocabulary, with its approximate bounds in years
+TIME_PERIODS = {
+    'archaic': (-750, -550),
+    'classical': (-550, -330),
+    'hellenistic-republican': (-330, -30),
+    'roman': (-30, 300),
+    'late-antique': (300, 640),
+    'mediaeval-byzantine': (640, 1453),
+    'modern': (1700, 2100)
+}
+BEFORE = ['bc', 'bce']
+AFTER = ['ad', 'ce']
+AT = ['in', 'during', 'around']
+FROM = ['between', 'from']
+UNTIL = ['and', 'to', 'until']
+logger = logging.getLogger(__name__)
+
+
+def parse_year(tokens: list, bare=True):
+    """
+    Return the year named by tokens such as ['300', 'bc'], ['ad', '14'] or
+    ['-300'] (negative years are BC), or None. With bare False, a plain
+    number without an era is not taken for a year.
+    """
+    era = None
+    if len(tokens) == 2 and tokens[0] in AFTER:
+        era, number = 1, tokens[1]
+    elif len(tokens) == 2 and tokens[1] in AFTER:
+        era, number = 1, tokens[0]
+    elif len(tokens) == 2 and tokens[1] in BEFORE:
+        era, number = -1, tokens[0]
+    elif len(tokens) == 1 and bare:
+        number = tokens[0]
+    else:
+        return None
+    try:
+        year = int(number)
+    except ValueError:
+        return None
+    if era is not None:
+        if year <= 0:
+            return None
+        year *= era
+    return year
+
+
+def parse_span(tokens: list):
+    """
+    Return (start, end) years for "in 300 bc", "between 100 bc and ad 100"
+    or a bare "300 bc", or None if tokens name no time.
+    """
+    if not tokens:
+        return None
+    if tokens[0] in AT:
+        year = parse_year(tokens[1:])
+        return None if year is None else (year, year)
+    if tokens[0] in FROM:
+        for i, token in enumerate(tokens):
+            if token in UNTIL:
+                start = parse_year(tokens[1:i])
+                end = parse_year(tokens[i + 1:])
+                if start is None or end is None:
+                    return None
+                return (min(start, end), max(start, end))
+        return None
+    year = parse_year(tokens, bare=False)
+    return None if year is None else (year, year)
+
+
+def format_year(year: int):
+    if year < 0:
+        return '{} BC'.format(-year)
+    return 'AD {}'.format(year)
+
+
+def format_spans(spans: list):
+    return ', '.join([
+        '{} to {}'.format(format_year(start), format_year(end))
+        for start, end in spans])
+
+
+def merge_spans(spans: list):
+    """Sort (start, end) spans and join any that overlap."""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class PeriodIndex:
+    """
+    Interval tree over the years during which places were active, with the
+    latest end kept per subtree so overlap queries prune early.
+    """
+
+    def __init__(self):
+        self.spans = {}     # pid -> merged (start, end) spans
+        self._nodes = []    # (start, end, pid, spans) sorted by start
+        self._max_end = []  # latest end in the subtree rooted at each node
+        self._overlay = Overlay()
+
+    def __len__(self):
+        return len(self.spans)
+
+    def add(self, pid: str, spans: list):
+        self.remove(pid)
+        spans = merge_spans(spans)
+        self.spans[pid] = spans
+        self._overlay.add(pid, spans)
+
+    def remove(self, pid: str):
+        spans = self.spans.pop(pid, None)
+        if spans is None:
+            return
+        self._overlay.remove(pid, len(spans))
+
+    def build(self):
+        nodes = sorted([
+            (start, end, pid, spans)
+            for pid, spans in self.spans.items() for start, end in spans],
+            key=lambda n: (n[0], n[1], n[2]))
+        max_end = [None] * len(nodes)
+        self._augment(nodes, max_end, 0, len(nodes))
+        self._nodes = nodes
+        self._max_end = max_end
+        self._overlay.clear()
+        logger.debug('built an interval tree of {} spans'.format(len(nodes)))
+
+    def _augment(self, nodes, max_end, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        latest = nodes[mid][1]
+        for child in [
+                self._augment(nodes, max_end, lo, mid),
+                self._augment(nodes, max_end, mid + 1, hi)]:
+            if child is not None and child > latest:
+                latest = child
+        max_end[mid] = latest
+        return latest
+
+    def active(self, year: int):
+        """Return pids of places active in year, earliest start first."""
+        return self.overlapping(year, year)
+
+    def overlapping(self, start: int, end: int):
+        """Return pids of places active at any time from start to end."""
+        if self._overlay.full():
+            self.build()
+        spans = self.spans
+        nodes = self._nodes
+        max_end = self._max_end
+        found = []
+
+        def visit(lo, hi):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            if max_end[mid] < start:
+                return
+            visit(lo, mid)
+            node_start, node_end, pid, owner = nodes[mid]
+            if node_start > end:
+                return
+            if node_end >= start and spans.get(pid) is owner:
+                found.append((node_start, pid))
+            visit(mid + 1, hi)
+
+        # an in-order walk, so tree matches arrive sorted by start
+        visit(0, len(nodes))
+        if self._overlay.pending:
+            for pid, owner in self._overlay.pending.items():
+                for node_start, node_end in owner:
+                    if node_start <= end and node_end >= start:
+                        found.append((node_start, pid))
+            found.sort()
+        pids = []
+        seen = set()
+        for node_start, pid in found:
+            if pid not in seen:
+                seen.add(pid)
+                pids.append(pid)
+        return pids
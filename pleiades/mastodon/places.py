@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Accessors for the place objects produced by pleiades.walker
+"""
+
+import logging
+from pleiades.mastodon.periods import TIME_PERIODS
+
+logger = logging.getLogger(__name__)
+
+
+def iter_places(place_collection):
+    """Iterate over every place held by a walker place collection."""
+    places = getattr(place_collection, 'places', None)
+    if places is None:
+        return iter(place_collection)
+    try:
+        return iter(places.values())
+    except AttributeError:
+        return iter(places)
+
+
+def place_id(place):
+    """
+    Return the Pleiades id of a place as a string.
+
+    A place without an id is known by the last segment of its uri.
+    """
+    pid = _value(place, 'id')
+    if pid is None:
+        uri = _value(place, 'uri')
+        if not uri:
+            raise ValueError('place has neither id nor uri: {!r}'.format(
+                place))
+        pid = str(uri).rstrip('/').rsplit('/', 1)[-1]
+    return str(pid)
+
+
+def place_modified(place):
+    """Return a sortable last-modified stamp for a place ('' if unknown)."""
+    for attr in ['last_modified', 'modified']:
+        value = _value(place, attr)
+        if value:
+            return str(value)
+    return ''
+
+
+def place_title(place):
+    """Return the title of a place, or None if it has none."""
+    title = _value(place, 'title')
+    return str(title) if title else None
+
+
+def place_names(place):
+    """
+    Return the title and all name strings known for a place.
+
+    Places and their names may be objects or the dicts of Pleiades JSON.
+    """
+    names = []
+    title = place_title(place)
+    if title:
+        names.append(title)
+    for name in _value(place, 'names') or []:
+        if isinstance(name, str):
+            names.append(name)
+            continue
+        for attr in ['romanized', 'attested']:
+            value = _value(name, attr)
+            if value:
+                names.extend([v.strip() for v in str(value).split(',')])
+    return [n for n in names if n]
+
+
+def place_point(place):
+    """
+    Return a place's representative point as (latitude, longitude).
+
+    Places may be objects or the dicts of Pleiades JSON, which stores
+    reprPoint in GeoJSON order, [longitude, latitude]; a point object with
+    x and y is read the same way. None if unlocated.
+    """
+    for attr in ['repr_point', 'reprPoint', 'representative_point']:
+        value = _value(place, attr)
+        if value is None:
+            continue
+        try:
+            longitude, latitude = value.x, value.y
+        except AttributeError:
+            try:
+                longitude, latitude = value[0], value[1]
+            except (IndexError, KeyError, TypeError):
+                continue
+        try:
+            return (float(latitude), float(longitude))
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _value(thing, key: str):
+    try:
+        return thing[key]
+    except (KeyError, TypeError, IndexError):
+        return getattr(thing, key, None)
+
+
+def _span(thing):
+    """(start, end) for a period key, a pair or anything with start/end."""
+    if isinstance(thing, str):
+        return TIME_PERIODS.get(thing.strip().lower())
+    for start_key, end_key in [('start', 'end'), ('minDate', 'maxDate')]:
+        start, end = _value(thing, start_key), _value(thing, end_key)
+        if start is not None and end is not None:
+            break
+    else:
+        try:
+            start, end = thing
+        except (TypeError, ValueError):
+            return None
+    try:
+        start, end = int(start), int(end)
+    except (TypeError, ValueError):
+        return None
+    return (min(start, end), max(start, end))
+
+
+def place_periods(place):
+    """
+    Return the (start, end) years during which a place is attested.
+
+    Spans come from the place's own time periods (Pleiades period keys or
+    year pairs) and from the start and end years of its locations and
+    names, whether the place is an object or a Pleiades JSON dict.
+    """
+    spans = []
+    for attr in ['periods', 'time_periods', 'timePeriods']:
+        for period in _value(place, attr) or []:
+            spans.append(_span(period))
+    for attr in ['locations', 'names']:
+        for thing in _value(place, attr) or []:
+            if not isinstance(thing, str):
+                spans.append(_span(thing))
+    return [span for span in spans if span is not None]
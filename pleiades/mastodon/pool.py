@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fork workers that share the parent's memory, and keep them running
+"""
+
+import gc
+import logging
+from multiprocessing import Pipe
+from multiprocessing.connection import wait
+import os
+from pleiades.mastodon.stream import Backoff
+import signal
+import sys
+import threading
+from time import monotonic, sleep
+
+DEFAULT_RESTART_DELAY = 5.0
+DEFAULT_MAX_RESTART_DELAY = 300.0
+STABLE_AFTER = 60.0     # a worker up this long has its restart delay reset
+POLL_INTERVAL = 0.5
+logger = logging.getLogger(__name__)
+
+
+def memory_usage(pid='self'):
+    """
+    Bytes of a process's memory by kind (Rss, Pss, Private_Dirty, ...) from
+    /proc/PID/smaps_rollup, or None where that is not available.
+    """
+    usage = {}
+    try:
+        with open('/proc/{}/smaps_rollup'.format(pid), 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) == 3 and fields[2] == 'kB':
+                    usage[fields[0].rstrip(':')] = int(fields[1]) * 1024
+    except OSError:
+        return None
+    return usage
+
+
+class BrainServer(threading.Thread):
+    """
+    Answer questions from forked workers with the one Brain in this process.
+
+    Sharing a brain copy-on-write is not enough by itself: reading a Python
+    object writes its reference count, so every worker answering from the
+    brain's indexes would slowly copy them for itself. Instead each worker
+    gets a BrainClient, made here before it is forked, and the brain is
+    only ever touched by this process.
+    """
+
+    def __init__(self, brain):
+        threading.Thread.__init__(self, name='brain-server', daemon=True)
+        self.brain = brain
+        self.connections = []
+        self.stopped = threading.Event()
+
+    def client(self):
+        ours, theirs = Pipe()
+        self.connections.append(ours)
+        return BrainClient(theirs)
+
+    def run(self):
+        while not self.stopped.is_set():
+            for connection in wait(self.connections, timeout=POLL_INTERVAL):
+                try:
+                    nonce, question = connection.recv()
+                except (EOFError, OSError):
+                    self.connections.remove(connection)
+                    continue
+                try:
+                    answers = self.brain.answer(question)
+                except Exception:
+                    logger.exception(
+                        'failed to answer "{}"'.format(question))
+                    answers = None
+                connection.send((nonce, answers))
+
+    def stop(self):
+        self.stopped.set()
+
+
+class BrainClient:
+    """
+    Stands in for a Brain in a worker, asking the BrainServer instead.
+
+    Every question is tagged, so a restarted worker ignores any answer left
+    in the pipe for the one that crashed.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.metrics = None
+        self.asked = 0
+        self.lock = threading.Lock()
+
+    def answer(self, question):
+        with self.lock:
+            self.asked += 1
+            nonce = (os.getpid(), self.asked)
+            self.connection.send((nonce, question))
+            while True:
+                replied, answers = self.connection.recv()
+                if replied == nonce:
+                    break
+        if answers is None:
+            raise RuntimeError('brain failed to answer "{}"'.format(question))
+        return answers
+
+
+class Supervisor:
+    """
+    One forked worker per named target, restarted with backoff on a crash.
+
+    Everything built before run() is shared copy-on-write with every
+    worker rather than copied; the garbage collector is frozen first, so
+    that collections in a worker do not touch, and so duplicate, the pages
+    holding it. A worker that exits cleanly is
+    not restarted; run() returns once none are left. Interrupting or
+    terminating the supervisor stops every worker.
+
+    Forking a process that runs other threads is unsafe: a lock one of
+    them holds stays locked for good in the child. When the caller needs
+    threads of its own (a BrainServer, say), spawn() the supervisor
+    before starting any, and wait() on it afterwards; workers are then
+    forked, and re-forked after a crash, from a process that has only
+    ever had one thread.
+    """
+
+    def __init__(self, targets: dict, restart_delay=DEFAULT_RESTART_DELAY,
+                 max_restart_delay=DEFAULT_MAX_RESTART_DELAY):
+        self.targets = targets
+        self.backoffs = {
+            name: Backoff(restart_delay, max_restart_delay)
+            for name in targets}
+        self.pids = {}
+        self.started = {}
+        self.due = {}
+        self.stopping = False
+
+    def run(self):
+        gc.collect()
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self._terminate)
+        for name in self.targets:
+            self._fork(name)
+        try:
+            while self.pids or self.due:
+                self._reap()
+                now = monotonic()
+                for name, when in list(self.due.items()):
+                    if when <= now:
+                        del self.due[name]
+                        self._fork(name)
+                sleep(POLL_INTERVAL)
+        except (KeyboardInterrupt, SystemExit):
+            logger.warning('stopping {} workers'.format(len(self.pids)))
+            self.stop()
+
+    def spawn(self):
+        """Run the supervisor in a forked process; return its pid."""
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self.run()
+            except BaseException:
+                logger.exception('supervisor failed')
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        logger.info('started supervisor as process {}'.format(pid))
+        return pid
+
+    @staticmethod
+    def wait(pid: int):
+        """
+        Wait for a spawned supervisor to finish and return its exit code,
+        passing SIGTERM on to it. An interrupt from the terminal reaches
+        the supervisor as well, so this keeps waiting while it stops its
+        workers.
+        """
+        def forward(signum, frame):
+            os.kill(pid, signum)
+        previous = signal.signal(signal.SIGTERM, forward)
+        try:
+            while True:
+                try:
+                    pid, status = os.waitpid(pid, 0)
+                except KeyboardInterrupt:
+                    continue
+                except ChildProcessError:
+                    return None
+                return os.waitstatus_to_exitcode(status)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+
+    def stop(self):
+        self.stopping = True
+        self.due = {}
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        while self.pids:
+            self._reap(block=True)
+
+    def _terminate(self, signum, frame):
+        raise SystemExit(128 + signum)
+
+    def _fork(self, name):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 1
+            try:
+                self.targets[name]()
+                code = 0
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                logger.exception('worker {} failed'.format(name))
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        logger.info('started worker {} as process {}'.format(name, pid))
+        self.pids[pid] = name
+        self.started[name] = monotonic()
+
+    def _reap(self, block=False):
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                self.pids = {}
+                return
+            if pid == 0:
+                return
+            name = self.pids.pop(pid, None)
+            if name is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code == 0 or self.stopping:
+                logger.info('worker {} exited with {}'.format(name, code))
+                continue
+            if monotonic() - self.started[name] >= STABLE_AFTER:
+                self.backoffs[name].reset()
+            delay = self.backoffs[name].next()
+            logger.warning(
+                'worker {} exited with {}; restarting in {:.1f} '
+                'seconds'.format(name, code, delay))
+            self.due[name] = monotonic() + delay
+            if block:
+                return
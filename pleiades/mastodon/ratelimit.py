@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token-bucket rate limiter for Mastodon API calls
+"""
+
+from collections import deque
+import logging
+import threading
+import time
+
+MASTODON_WINDOW_REQUESTS = 300  # requests allowed ...
+MASTODON_WINDOW = 300.0         # ... per this many seconds
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Shared budget of API requests.
+
+    The bucket holds up to one window's worth of tokens and refills at the
+    steady window rate, so short bursts (a multi-part reply) go out at once
+    while the long-run rate never exceeds the instance's budget. When the
+    instance reports its own limit, remaining count and reset time, those
+    take precedence over the local estimate.
+    """
+
+    def __init__(self, capacity=MASTODON_WINDOW_REQUESTS,
+                 window=MASTODON_WINDOW, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.capacity = capacity
+        self.window = window
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.blocked_until = None
+        self.granted = deque()
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.capacity / self.window
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        while self.granted and self.granted[0] <= now - self.window:
+            self.granted.popleft()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; return wait."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._refill(now)
+                if self.blocked_until is not None:
+                    if now < self.blocked_until:
+                        delay = self.blocked_until - now
+                    else:
+                        self.blocked_until = None
+                        delay = None
+                else:
+                    delay = None
+                if delay is None:
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        self.granted.append(now)
+                        self.waited += waited
+                        return waited
+                    delay = (1.0 - self.tokens) / self.rate
+            logger.debug('rate limited: waiting {:.3f} seconds'.format(delay))
+            self.sleep(delay)
+            waited += delay
+
+    def observe(self, limit=None, remaining=None, reset=None):
+        """Fold in the instance's rate-limit headers, where provided."""
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            if limit:
+                self.capacity = int(limit)
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+                if int(remaining) <= 0 and reset is not None:
+                    self.blocked_until = now + max(
+                        0.0, float(reset) - time.time())
+
+    def utilization(self):
+        """Fraction of the window's budget used in the last window."""
+        with self.lock:
+            self._refill(self.clock())
+            return len(self.granted) / self.capacity
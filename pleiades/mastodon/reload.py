@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Watch the Pleiades JSON tree and hot reload changed places into a brain
+"""
+
+import logging
+import os
+from os.path import abspath, basename, dirname, join, realpath, splitext
+from pleiades.mastodon.places import iter_places
+from pleiades.mastodon.snapshot import scan, walk
+import tempfile
+import threading
+
+DEFAULT_RELOAD_INTERVAL = 60.0
+logger = logging.getLogger(__name__)
+
+
+def diff(old: dict, new: dict):
+    """Return (changed or added paths, removed paths) between two scans."""
+    changed = [p for p, stat in new.items() if old.get(p) != stat]
+    removed = [p for p in old if p not in new]
+    return changed, removed
+
+
+class Reloader(threading.Thread):
+    """
+    Background thread that keeps a Brain in step with the JSON tree.
+
+    Every interval the tree is stat-scanned; only files that were added,
+    changed or removed since the last scan are handed to the walker (via a
+    staging directory of links to them) and the resulting places are
+    swapped into the brain with Brain.update().
+    """
+
+    def __init__(self, brain, json_path: str,
+                 interval=DEFAULT_RELOAD_INTERVAL, stats=None):
+        threading.Thread.__init__(self, name='reloader', daemon=True)
+        self.brain = brain
+        self.json_path = abspath(realpath(json_path))
+        self.interval = interval
+        if stats is None:
+            stats = scan(self.json_path)
+        self.stats = stats
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception('hot reload failed; will retry')
+
+    def stop(self):
+        self.stopped.set()
+
+    def check(self):
+        stats = scan(self.json_path)
+        changed, removed = diff(self.stats, stats)
+        if not changed and not removed:
+            return 0
+        logger.info(
+            'reloading {} changed and {} removed place files'.format(
+                len(changed), len(removed)))
+        places = self._walk(changed) if changed else []
+        # Pleiades JSON files are named for the place they describe
+        removed_ids = [splitext(basename(p))[0] for p in removed]
+        self.brain.update(places, removed_ids)
+        self.stats = stats
+        return len(changed) + len(removed)
+
+    def _walk(self, paths: list):
+        with tempfile.TemporaryDirectory(prefix='pleiades-reload-') as stage:
+            for path in paths:
+                target = join(stage, path)
+                os.makedirs(dirname(target), exist_ok=True)
+                os.symlink(join(self.json_path, path), target)
+            place_count, place_collection = walk(stage)
+            return list(iter_places(place_collection))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Binary snapshot of the walked Pleiades place collection
+"""
+
+import hashlib
+import logging
+import os
+from os.path import abspath, dirname, join, realpath, relpath
+import pickle
+from pleiades.mastodon.store import compact
+
+DEFAULT_SNAPSHOT_PATH = join('data', 'places.snapshot')
+SNAPSHOT_VERSION = 3
+logger = logging.getLogger(__name__)
+
+
+def scan(json_path: str):
+    """Return {relative path: (mtime_ns, size)} for every JSON file."""
+    stats = {}
+    stack = [json_path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith('.json'):
+                    st = entry.stat()
+                    stats[relpath(entry.path, json_path)] = (
+                        st.st_mtime_ns, st.st_size)
+    return stats
+
+
+def fingerprint(stats: dict):
+    """Digest of file paths, mtimes and sizes: the snapshot key."""
+    h = hashlib.sha1()
+    for path in sorted(stats):
+        mtime, size = stats[path]
+        h.update('{}\0{}\0{}\n'.format(path, mtime, size).encode('utf-8'))
+    return h.hexdigest()
+
+
+def walk(json_path: str):
+    """Walk a JSON tree, keeping only the compact form of each place."""
+    # imported here, so replays of synthetic places run without the walker
+    from pleiades.walker.walker import PleiadesWalker
+    walker = PleiadesWalker(path=json_path)
+    place_count, place_collection = walker.walk()
+    del walker
+    return place_count, compact(place_collection)
+
+
+def read_snapshot(snapshot_path: str, key: str):
+    """Return (place_count, place_collection), or None if stale/absent."""
+    try:
+        with open(snapshot_path, 'rb') as f:
+            header = pickle.load(f)
+            if header != (SNAPSHOT_VERSION, key):
+                logger.info(
+                    'snapshot {} is stale'.format(snapshot_path))
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (pickle.UnpicklingError, EOFError, AttributeError,
+            ImportError) as e:
+        logger.warning(
+            'ignoring unreadable snapshot {}: {}'.format(snapshot_path, e))
+        return None
+
+
+def write_snapshot(snapshot_path: str, key: str, place_count,
+                   place_collection):
+    path = abspath(snapshot_path)
+    os.makedirs(dirname(path), exist_ok=True)
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(
+            (SNAPSHOT_VERSION, key), f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(
+            (place_count, place_collection), f,
+            protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_places(json_path: str, snapshot_path=DEFAULT_SNAPSHOT_PATH,
+                rebuild=False, bypass=False, stats=None):
+    """
+    Return (place_count, place_collection) for a Pleiades JSON tree.
+
+    A snapshot keyed on the tree's file mtimes and sizes is used when it
+    is current, so a warm start skips JSON parsing. With rebuild the tree
+    is walked and the snapshot rewritten regardless; with bypass the
+    snapshot is neither read nor written. Given stats, a scan() of the
+    tree taken before loading, the key is made from those rather than a
+    fresh scan; a Reloader started from the same stats then also picks up
+    files that change while the tree is being walked.
+    """
+    path = abspath(realpath(json_path))
+    if bypass:
+        return _report(walk(path))
+    if stats is None:
+        stats = scan(path)
+    key = fingerprint(stats)
+    if not rebuild:
+        loaded = read_snapshot(snapshot_path, key)
+        if loaded is not None:
+            logger.info('loaded places from snapshot {}'.format(
+                snapshot_path))
+            return _report(loaded)
+    place_count, place_collection = walk(path)
+    write_snapshot(snapshot_path, key, place_count, place_collection)
+    logger.info('wrote snapshot {}'.format(snapshot_path))
+    return _report((place_count, place_collection))
+
+
+def _report(loaded: tuple):
+    # measuring walks every object, so only when someone will see it
+    place_count, place_collection = loaded
+    if logger.isEnabledFor(logging.INFO):
+        logger.info('{} places held in {:.1f} MiB'.format(
+            place_count, place_collection.footprint() / 2**20))
+    return loaded
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KD-tree over place representative points for proximity queries
+"""
+
+from heapq import heappop, heappush
+import logging
+from math import asin, cos, pi, radians, sin
+from pleiades.mastodon.overlay import Overlay
+
+DEFAULT_NEAR_COUNT = 10
+EARTH_RADIUS_KM = 6371.0088
+logger = logging.getLogger(__name__)
+
+
+def to_vector(point: tuple):
+    """Unit vector for a (latitude, longitude) point."""
+    latitude, longitude = radians(point[0]), radians(point[1])
+    return (
+        cos(latitude) * cos(longitude), cos(latitude) * sin(longitude),
+        sin(latitude))
+
+
+def chord_for(km: float):
+    """Straight-line distance through the unit sphere for km along it."""
+    if km >= pi * EARTH_RADIUS_KM:
+        return 2.0
+    return 2.0 * sin(km / (2.0 * EARTH_RADIUS_KM))
+
+
+def km_for(chord: float):
+    return 2.0 * EARTH_RADIUS_KM * asin(min(1.0, chord / 2.0))
+
+
+class SpatialIndex:
+    """
+    Nearest-neighbour and radius search over (latitude, longitude) points,
+    kept as unit vectors in a KD-tree.
+    """
+
+    def __init__(self):
+        self.vectors = {}   # pid -> unit vector
+        self._nodes = []    # (vector, pid) in KD-tree order
+        self._overlay = Overlay()
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def add(self, pid: str, point: tuple):
+        self.remove(pid)
+        vector = to_vector(point)
+        self.vectors[pid] = vector
+        self._overlay.add(pid, vector)
+
+    def remove(self, pid: str):
+        if self.vectors.pop(pid, None) is None:
+            return
+        self._overlay.remove(pid)
+
+    def build(self):
+        nodes = [(vector, pid) for pid, vector in self.vectors.items()]
+        self._build(nodes, 0, len(nodes), 0)
+        self._nodes = nodes
+        self._overlay.clear()
+        logger.debug('built a KD-tree of {} points'.format(len(nodes)))
+
+    def _build(self, nodes: list, lo: int, hi: int, depth: int):
+        if hi - lo <= 1:
+            return
+        axis = depth % 3
+        nodes[lo:hi] = sorted(nodes[lo:hi], key=lambda n: n[0][axis])
+        mid = (lo + hi) // 2
+        self._build(nodes, lo, mid, depth + 1)
+        self._build(nodes, mid + 1, hi, depth + 1)
+
+    def nearest(self, point: tuple, count=DEFAULT_NEAR_COUNT, exclude=()):
+        """Return up to count (km, pid) pairs, closest first."""
+        return self._search(point, count, 4.0, exclude)
+
+    def within(self, point: tuple, km: float, exclude=()):
+        """Return (km, pid) pairs for every point within km, closest first."""
+        return self._search(point, None, chord_for(km) ** 2, exclude)
+
+    def _search(self, point: tuple, count, bound: float, exclude):
+        if self._overlay.full():
+            self.build()
+        query = to_vector(point)
+        vectors = self.vectors
+        nodes = self._nodes
+        heap = []   # (-squared chord, pid), farthest on top
+
+        def consider(vector, pid):
+            nonlocal bound
+            if vectors.get(pid) is not vector or pid in exclude:
+                return
+            d2 = (
+                (query[0] - vector[0]) ** 2 + (query[1] - vector[1]) ** 2 +
+                (query[2] - vector[2]) ** 2)
+            if d2 > bound:
+                return
+            heappush(heap, (-d2, pid))
+            if count is not None and len(heap) >= count:
+                if len(heap) > count:
+                    heappop(heap)
+                bound = -heap[0][0]
+
+        def visit(lo, hi, depth):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            vector, pid = nodes[mid]
+            consider(vector, pid)
+            axis = depth % 3
+            diff = query[axis] - vector[axis]
+            if diff < 0:
+                visit(lo, mid, depth + 1)
+                if diff * diff <= bound:
+                    visit(mid + 1, hi, depth + 1)
+            else:
+                visit(mid + 1, hi, depth + 1)
+                if diff * diff <= bound:
+                    visit(lo, mid, depth + 1)
+
+        if count is not None and count <= 0:
+            return []
+        visit(0, len(nodes), 0)
+        for pid, vector in self._overlay.pending.items():
+            consider(vector, pid)
+        found = sorted([(-negative, pid) for negative, pid in heap])
+        return [(km_for(d2 ** 0.5), pid) for d2, pid in found]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact, read-only store of just the place data the brain answers from
+"""
+
+import logging
+from pleiades.mastodon.places import (
+    iter_places, place_id, place_modified, place_names, place_periods,
+    place_point, place_title)
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+PLACE_URI = 'https://pleiades.stoa.org/places/{}'
+
+
+class CompactPlace:
+    """
+    The fields the brain reads from a walked place, and nothing else.
+
+    Answers are rendered as the walked place rendered itself. Where that
+    rendering is just the title, description and Pleiades URI, only the
+    description is kept and the text is put back together on demand;
+    otherwise the rendered text is kept as it was. Repeated strings are
+    interned and every record is a __slots__ object rather than a dict.
+    """
+
+    __slots__ = (
+        'id', 'title', 'names', 'last_modified', 'repr_point', 'periods',
+        'description', 'text')
+
+    def __init__(self, pid: str, title: str, names: tuple,
+                 last_modified: str, repr_point, periods: tuple,
+                 description=None, text=None):
+        self.id = pid
+        self.title = title
+        self.names = names
+        self.last_modified = last_modified
+        self.repr_point = repr_point
+        self.periods = periods
+        self.description = description
+        self.text = text
+
+    def __str__(self):
+        if self.text is not None:
+            return self.text
+        return render(self.title, self.description, self.id)
+
+    # __slots__ objects need help to pickle into a snapshot
+    def __getstate__(self):
+        return tuple([getattr(self, slot) for slot in self.__slots__])
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+
+def render(title: str, description: str, pid: str):
+    """The usual rendering of a place: title, description and URI."""
+    return '\n\n'.join((title, description, PLACE_URI.format(pid)))
+
+
+def compact_place(place):
+    """Return a CompactPlace that answers exactly as place does."""
+    names = [sys.intern(n) for n in place_names(place)]
+    if place_title(place):
+        title, names = names[0], tuple(names[1:])
+    else:
+        title, names = None, tuple(names)
+    point = place_point(place)
+    if point is not None:
+        # place_point reads GeoJSON order, longitude first
+        point = (point[1], point[0])
+    pid = sys.intern(place_id(place))
+    text = str(place)
+    description = getattr(place, 'description', None)
+    if (title is not None and isinstance(description, str) and
+            text == render(title, description, pid)):
+        text = None
+    else:
+        description = None
+    return CompactPlace(
+        pid, title, names, sys.intern(place_modified(place)) or None, point,
+        tuple(place_periods(place)), description, text)
+
+
+class CompactCollection:
+    """Compact places, held by id as a walker collection holds them."""
+
+    def __init__(self, places):
+        self.places = {p.id: p for p in places}
+
+    def __len__(self):
+        return len(self.places)
+
+    def footprint(self):
+        """Bytes held by the store, counting shared objects once."""
+        return footprint(self.places)
+
+
+def compact(place_collection):
+    """Return a CompactCollection of every place in place_collection."""
+    return CompactCollection(
+        [compact_place(place) for place in iter_places(place_collection)])
+
+
+def footprint(root):
+    """Deep sys.getsizeof of an object graph, counting each object once."""
+    seen = set()
+    total = 0
+    stack = [root]
+    while stack:
+        thing = stack.pop()
+        if id(thing) in seen:
+            continue
+        seen.add(id(thing))
+        total += sys.getsizeof(thing)
+        if isinstance(thing, dict):
+            stack.extend(thing.keys())
+            stack.extend(thing.values())
+        elif isinstance(thing, (list, tuple, set, frozenset)):
+            stack.extend(thing)
+        elif isinstance(thing, (str, bytes, int, float, type(None))):
+            continue
+        else:
+            slots = getattr(type(thing), '__slots__', ())
+            stack.extend([
+                getattr(thing, slot) for slot in slots
+                if hasattr(thing, slot)])
+            if hasattr(thing, '__dict__'):
+                stack.append(thing.__dict__)
+    return total
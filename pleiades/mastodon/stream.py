@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Server-sent events client for the Mastodon user streaming endpoint
+"""
+
+from datetime import datetime
+from http.client import HTTPException
+import json
+import logging
+import random
+from urllib.parse import urlsplit, urlunsplit
+from urllib.request import Request, urlopen
+
+STREAM_PATH = '/api/v1/streaming/user'
+DEFAULT_STREAM_TIMEOUT = 60.0   # Mastodon sends a heartbeat every ~20 s
+DEFAULT_BACKOFF_INITIAL = 1.0
+DEFAULT_BACKOFF_MAXIMUM = 300.0
+STABLE_AFTER = 60.0     # a connection up this long has its backoff reset
+logger = logging.getLogger(__name__)
+
+
+def stream_url(base_url: str, path=STREAM_PATH):
+    """HTTP(S) URL for a streaming path, given an http(s) or ws(s) base."""
+    parts = urlsplit(base_url)
+    scheme = {'ws': 'http', 'wss': 'https'}.get(parts.scheme, parts.scheme)
+    return urlunsplit((
+        scheme, parts.netloc, parts.path.rstrip('/') + path, '', ''))
+
+
+def parse_events(lines):
+    """
+    Yield (event, data) for each server-sent event in an iterable of lines;
+    comments (the stream's heartbeats) yield (None, None).
+    """
+    event = None
+    data = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.rstrip('\r\n')
+        if not line:
+            if data:
+                yield event or 'message', '\n'.join(data)
+            event = None
+            data = []
+        elif line.startswith(':'):
+            yield None, None
+        else:
+            field, _, value = line.partition(':')
+            if value.startswith(' '):
+                value = value[1:]
+            if field == 'event':
+                event = value
+            elif field == 'data':
+                data.append(value)
+
+
+def parse_notification(data: str):
+    """Decode a notification payload as Mastodon.py would return it."""
+    n = json.loads(data)
+    created_at = n.get('created_at')
+    if isinstance(created_at, str):
+        n['created_at'] = datetime.fromisoformat(
+            created_at.replace('Z', '+00:00'))
+    return n
+
+
+class Backoff:
+    """Exponential reconnect delays with jitter, reset after a success."""
+
+    def __init__(self, initial=DEFAULT_BACKOFF_INITIAL,
+                 maximum=DEFAULT_BACKOFF_MAXIMUM, factor=2.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.current = initial
+
+    def next(self):
+        delay = self.current / 2 + random.uniform(0, self.current / 2)
+        self.current = min(self.maximum, self.current * self.factor)
+        return delay
+
+    def reset(self):
+        self.current = self.initial
+
+
+class NotificationStream:
+    """
+    One connection at a time to the user stream.
+
+    connect() opens it; events() then yields each notification (as a dict)
+    and None for every heartbeat, and ends when the server closes the
+    stream. Network errors propagate as OSError, and so do a stream cut
+    off mid-chunk and an event that cannot be decoded, since either way
+    the connection can no longer be trusted.
+    """
+
+    def __init__(self, url: str, access_token=None,
+                 timeout=DEFAULT_STREAM_TIMEOUT):
+        self.url = url
+        self.access_token = access_token
+        self.timeout = timeout
+        self.response = None
+
+    def connect(self):
+        self.close()
+        headers = {'Accept': 'text/event-stream'}
+        if self.access_token:
+            headers['Authorization'] = 'Bearer {}'.format(self.access_token)
+        try:
+            self.response = urlopen(
+                Request(self.url, headers=headers), timeout=self.timeout)
+        except HTTPException as e:
+            raise OSError('bad stream: {!r}'.format(e)) from e
+        logger.info('connected to {}'.format(self.url))
+
+    def events(self):
+        if self.response is None:
+            self.connect()
+        try:
+            for event, data in parse_events(self.response):
+                if event is None:
+                    yield None
+                elif event == 'notification':
+                    yield parse_notification(data)
+        except (HTTPException, ValueError) as e:
+            raise OSError('bad stream: {!r}'.format(e)) from e
+        finally:
+            self.close()
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+            self.response = None
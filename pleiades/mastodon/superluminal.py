@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Figlet renderings for the superluminal easter egg, cached and pre-rendered
+"""
+
+from functools import lru_cache
+import json
+import logging
+import os
+from os.path import abspath, dirname, join
+from pleiades.mastodon.packing import REPLY_MAX_CHARS, toot_length
+from pyfiglet import Figlet, FigletError
+import random
+
+DEFAULT_ARTIFACT_PATH = join('data', 'superluminal.json')
+ARTIFACT_VERSION = 2
+FONT_CACHE_SIZE = 16
+RENDER_CACHE_SIZE = 1024    # room for every text in every cached font
+DEFAULT_PER_TEXT = 16   # renderings kept per text in the artifact
+logger = logging.getLogger(__name__)
+SUPERFLUITIES = [
+    'Sterope', 'Merope', 'Electra', 'Maia', 'Taygeta', 'Celaeno',
+    'Alcyone', 'Atlas', 'Pleione', 'Eta (25) Tauri', '27 Tauri',
+    '17 Tauri', '20 Tauri', '23 Tauri', '19 Tauri', '28 (BU) Tauri',
+    '16 Tauri', 'Asterope', '21 Tauri', '22 Tauri', '18 Tauri',
+    'Seven Sisters', 'Messier 45', 'Atlantides', 'Vergiliae',
+    'Matariki', 'Krittika', 'Thurayya', 'MULMUL', 'Mutsuraboshi',
+    'Subaru', '1610', 'Con†Stellation', 'NASFA',
+    'https://en.wikipedia.org/wiki/Pleiades',
+    'https://scaife.perseus.org/search/?kind=form&p=3&q=pleiades',
+    'https://scaife.perseus.org/search/?q=%CE%A0%CE%BB%CE%B5%CE%B9%CE%AC%CE%B4%CE%B5%CF%82&kind=lemma'
+]
+FONTS = ['1row', '3-d', '3d_diagonal', '3x5', '4max', '4x4_offr', '5lineoblique', '5x7', '5x8', '64f1____', '6x10', '6x9', 'B1FF', 'DANC4', 'ICL-1900', 'a_zooloo', 'acrobatic', 'advenger', 'alligator', 'alligator2', 'alligator3', 'alpha', 'alphabet', 'amc3line', 'amc3liv1', 'amcaaa01', 'amcneko', 'amcrazo2', 'amcrazor', 'amcslash', 'amcslder', 'amcthin', 'amctubes', 'amcun1', 'aquaplan', 'arrows', 'asc_____', 'ascii9', 'ascii___', 'ascii_new_roman', 'assalt_m', 'asslt__m', 'atc_____', 'atc_gran', 'avatar', 'b_m__200', 'banner', 'banner3-D', 'banner3', 'banner4', 'barbwire', 'basic', 'battle_s', 'battlesh', 'baz__bil', 'bear', 'beer_pub', 'bell', 'benjamin', 'big', 'bigascii12', 'bigascii9', 'bigchief', 'bigfig', 'bigmono12', 'bigmono9', 'binary', 'block', 'blocks', 'bolger', 'braced', 'bright', 'brite', 'briteb', 'britebi', 'britei', 'broadway', 'broadway_kb', 'bubble', 'bubble__', 'bubble_b', 'bulbhead', 'c1______', 'c2______', 'c_ascii_', 'c_consen', 'calgphy2', 'caligraphy', 'cards', 'catwalk', 'caus_in_', 'char1___', 'char2___', 'char3___', 'char4___', 'charact1', 'charact2', 'charact3', 'charact4', 'charact5', 'charact6', 'characte', 'charset_', 'chartr', 'chartri', 'chiseled', 'chunky', 'circle', 'clb6x10', 'clb8x10', 'clb8x8', 'cli8x8', 'clr4x6', 'clr5x10', 'clr5x6', 'clr5x8', 'clr6x10', 'clr6x6', 'clr6x8', 'clr7x10', 'clr7x8', 'clr8x10', 'clr8x8', 'coil_cop', 'coinstak', 'cola', 'colossal', 'com_sen_', 'computer', 'contessa', 'contrast', 'convoy__', 'cosmic', 'cosmike', 'cour', 'courb', 'courbi', 'couri', 'crawford', 'crazy', 'cricket', 'cursive', 'cyberlarge', 'cybermedium', 'cybersmall', 'cygnet', 'd_dragon', 'dancingfont', 'dcs_bfmo', 'decimal', 'deep_str', 'defleppard', 'demo_1__', 'demo_2__', 'demo_m__', 'devilish', 'diamond', 'dietcola', 'digital', 'doh', 'doom', 'dosrebel', 'dotmatrix', 'double', 'doubleshorts', 'drpepper', 'druid___', 'dwhistled', 'e__fist_', 'ebbs_1__', 'ebbs_2__', 'eca_____', 'eftichess', 'eftifont', 'eftipiti', 'eftirobot', 'eftitalic', 'eftiwall', 'eftiwater', 'emboss', 'emboss2', 'epic', 'etcrvs__', 'f15_____', 'faces_of', 'fair_mea', 'fairligh', 'fantasy_', 'fbr12___', 'fbr1____', 'fbr2____', 'fbr_stri', 'fbr_tilt', 'fender', 'filter', 'finalass', 'fire_font-k', 'fire_font-s', 'fireing_', 'flipped', 'flowerpower', 'flyn_sh', 'fourtops', 'fp1_____', 'fp2_____', 'fraktur', 'funface', 'funfaces', 'funky_dr', 'future', 'future_1', 'future_2', 'future_3', 'future_4', 'future_5', 'future_6', 'future_7', 'future_8', 'fuzzy', 'gauntlet', 'georgi16', 'georgia11.flf ', 'ghost', 'ghost_bo', 'ghoulish', 'glenyn', 'goofy', 'gothic', 'gothic__', 'graceful', 'gradient', 'graffiti', 'grand_pr', 'greek', 'green_be', 'hades___', 'heart_left', 'heart_right', 'heavy_me', 'helv', 'helvb', 'helvbi', 'helvi', 'henry3d', 'heroboti', 'hex', 'hieroglyphs', 'high_noo', 'hills___', 'hollywood', 'home_pak', 'horizontalleft', 'horizontalright', 'house_of', 'hypa_bal', 'hyper___', 'impossible', 'inc_raw_', 'invita', 'isometric1', 'isometric2', 'isometric3', 'isometric4', 'italic', 'italics_', 'ivrit', 'jacky', 'jazmine', 'jerusalem', 'joust___', 'katakana', 'kban', 'keyboard', 'kgames_i', 'kik_star', 'knob', 'konto', 'kontoslant', 'krak_out', 'larry3d', 'lazy_jon', 'lcd', 'lean', 'letter', 'letter_w', 'letters', 'letterw3', 'lexible_', 'lildevil', 'lineblocks', 'linux', 'lockergnome', 'mad_nurs', 'madrid', 'magic_ma', 'marquee', 'master_o', 'maxfour', 'mayhem_d', 'mcg_____', 'merlin1', 'merlin2', 'mig_ally', 'mike', 'mini', 'mirror', 'mnemonic', 'modern__', 'modular', 'mono12', 'mono9', 'morse', 'morse2', 'moscow', 'mshebrew210', 'muzzle', 'nancyj-fancy', 'nancyj-improved', 'nancyj-underlined', 'nancyj', 'new_asci', 'nfi1____', 'nipples', 'notie_ca', 'npn_____', 'nscript', 'ntgreek', 'nvscript', 'o8', 'octal', 'odel_lak', 'ogre', 'ok_beer_', 'oldbanner', 'os2', 'outrun__', 'p_s_h_m_', 'p_skateb', 'pacos_pe', 'pagga', 'panther_', 'pawn_ins', 'pawp', 'peaks', 'peaksslant', 'pebbles', 'pepper', 'phonix__', 'platoon2', 'platoon_', 'pod_____', 'poison', 'puffy', 'puzzle', 'pyramid', 'r2-d2___', 'rad_____', 'rad_phan', 'radical_', 'rainbow_', 'rally_s2', 'rally_sp', 'rammstein', 'rampage_', 'rastan__', 'raw_recu', 'rci_____', 'rectangles', 'red_phoenix', 'relief', 'relief2', 'rev', 'reverse', 'ripper!_', 'road_rai', 'rockbox_', 'rok_____', 'roman', 'roman___', 'rot13', 'rot13', 'rotated', 'rounded', 'rowancap', 'rozzo', 'runic', 'runyc', 's-relief', 'sans', 'sansb', 'sansbi', 'sansi', 'santaclara', 'sblood', 'sbook', 'sbookb', 'sbookbi', 'sbooki', 'script', 'script__', 'serifcap', 'shadow', 'shimrod', 'short', 'skate_ro', 'skateord', 'skateroc', 'sketch_s', 'slant', 'slide', 'slscript', 'sm______', 'small', 'smallcaps', 'smascii9', 'smblock', 'smbraille', 'smisome1', 'smkeyboard', 'smmono12', 'smmono9', 'smpoison', 'smscript', 'smshadow', 'smslant', 'smtengwar', 'soft', 'space_op', 'spc_demo', 'speed', 'spliff', 'stacey', 'stampate', 'stampatello', 'standard', 'star_war', 'starstrips', 'starwars', 'stealth_', 'stellar', 'stencil1', 'stencil2', 'stforek', 'stop', 'straight', 'street_s', 'sub-zero', 'subteran', 'super_te', 'swampland', 'swan', 'sweet', 't__of_ap', 'tanja', 'tav1____', 'taxi____', 'tec1____', 'tec_7000', 'tecrvs__', 'tengwar', 'term', 'test1', 'thick', 'thin', 'threepoint', 'ti_pan__', 'ticks', 'ticksslant', 'tiles', 'times', 'timesofl', 'tinker-toy', 'tomahawk', 'tombstone', 'top_duck', 'train', 'trashman', 'trek', 'triad_st', 'ts1_____', 'tsalagi', 'tsm_____', 'tsn_base', 'tty', 'ttyb', 'tubular', 'twin_cob', 'twisted', 'twopoint', 'type_set', 'ucf_fan_', 'ugalympi', 'unarmed_', 'univers', 'upper', 'usa_____', 'usa_pq__', 'usaflag', 'utopia', 'utopiab', 'utopiabi', 'utopiai', 'varsity', 'vortron_', 'war_of_w', 'wavy', 'weird', 'wetletter', 'whimsy', 'wideterm', 'wow', 'xbrite', 'xbriteb', 'xbritebi', 'xbritei', 'xchartr', 'xchartri', 'xcour', 'xcourb', 'xcourbi', 'xcouri', 'xhelv', 'xhelvb', 'xhelvbi', 'xhelvi', 'xsans', 'xsansb', 'xsansbi', 'xsansi', 'xsbook', 'xsbookb', 'xsbookbi', 'xsbooki', 'xtimes', 'xtty', 'xttyb', 'yie-ar__', 'yie_ar_k', 'z-pilot_', 'zig_zag_', 'zone7___']
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def load_font(font: str):
+    """Return a Figlet for font, or None if pyfiglet cannot load it."""
+    try:
+        return Figlet(font=font)
+    except FigletError as e:
+        logger.debug('skipping figlet font {!r}: {}'.format(font, e))
+        return None
+
+
+def _fit(figlet: Figlet, text: str, max_chars: int):
+    rendered = figlet.renderText(text)
+    if not rendered.strip() or toot_length(rendered) > max_chars:
+        return None
+    return rendered
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render(font: str, text: str, max_chars=REPLY_MAX_CHARS):
+    """Return text rendered in font, or None if unloadable or too long."""
+    figlet = load_font(font)
+    if figlet is None:
+        return None
+    return _fit(figlet, text, max_chars)
+
+
+def prerender(per_text=DEFAULT_PER_TEXT, max_chars=REPLY_MAX_CHARS,
+              seed=0):
+    """Return {text: [rendering, ...]} of up to per_text fonts per text."""
+    fonts = sorted(set(FONTS))
+    random.Random(seed).shuffle(fonts)
+    renderings = {text: [] for text in SUPERFLUITIES if 'http' not in text}
+    # font by font, so each font file is parsed once
+    for font in fonts:
+        wanted = [
+            text for text, kept in renderings.items()
+            if len(kept) < per_text]
+        if not wanted:
+            break
+        figlet = load_font(font)
+        if figlet is None:
+            continue
+        for text in wanted:
+            rendered = _fit(figlet, text, max_chars)
+            if rendered is not None:
+                renderings[text].append(rendered)
+    return renderings
+
+
+def write_artifact(path: str, renderings: dict, max_chars: int):
+    path = abspath(path)
+    os.makedirs(dirname(path), exist_ok=True)
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': ARTIFACT_VERSION, 'max_chars': max_chars,
+            'renderings': renderings}, f)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path: str, max_chars: int):
+    """Return the artifact's renderings, or None if absent or unusable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning('ignoring unreadable {}: {}'.format(path, e))
+        return None
+    if (artifact.get('version') != ARTIFACT_VERSION or
+            artifact.get('max_chars', max_chars + 1) > max_chars):
+        logger.warning('ignoring out of date {}'.format(path))
+        return None
+    return artifact['renderings']
+
+
+class Superluminal:
+    """
+    Picks a superfluity and, unless it is a link, a figlet rendering of it.
+
+    Renderings come from the pre-rendered artifact when there is one (see
+    scripts/prerender_superluminal.py), read on first use. Otherwise the
+    answer is drawn from a working set of FONT_CACHE_SIZE fonts, picked at
+    random and validated as they are first loaded, with every rendering
+    memoized; renderings longer than max_chars are never chosen, and if
+    none fits the text is answered plain. The default max_chars is what
+    a reply to the longest possible account has room for, so the art is
+    never split across toots.
+    """
+
+    def __init__(self, artifact_path=DEFAULT_ARTIFACT_PATH,
+                 max_chars=REPLY_MAX_CHARS):
+        self.artifact_path = artifact_path
+        self.max_chars = max_chars
+        self._renderings = None
+        self._loaded = False
+        self._fonts = []
+        self._untried = None
+
+    def _working_fonts(self):
+        if self._untried is None:
+            self._untried = sorted(set(FONTS))
+            random.shuffle(self._untried)
+        while len(self._fonts) < FONT_CACHE_SIZE and self._untried:
+            font = self._untried.pop()
+            if load_font(font) is not None:
+                self._fonts.append(font)
+        return self._fonts
+
+    def pick(self):
+        text = random.choice(SUPERFLUITIES)
+        if 'http' in text:
+            return text
+        if not self._loaded:
+            self._loaded = True
+            if self.artifact_path:
+                self._renderings = read_artifact(
+                    self.artifact_path, self.max_chars)
+        if self._renderings and self._renderings.get(text):
+            return random.choice(self._renderings[text])
+        fonts = self._working_fonts()
+        for font in random.sample(fonts, len(fonts)):
+            rendered = render(font, text, self.max_chars)
+            if rendered is not None:
+                return rendered
+        return text
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic Pleiades-like places for benchmarks and offline replay
+"""
+
+import logging
+from pleiades.mastodon.periods import TIME_PERIODS
+import random
+
+SYLLABLES = [
+    'ath', 'en', 'ai', 'rom', 'a', 'ko', 'rin', 'thos', 'eph', 'es', 'os',
+    'sa', 'la', 'mis', 'tar', 'ra', 'co', 'lep', 'tis', 'mag', 'na', 'del',
+    'phi', 'ol', 'ym', 'pi', 'hal', 'ik', 'ar', 'nas', 'sos', 'by', 'zan',
+    'ti', 'um', 'ca', 'ly', 'don', 'me', 'gar', 'syr', 'cu', 'sae', 'pol']
+FEATURES = [
+    'settlement', 'temple', 'sanctuary', 'fort', 'villa', 'bridge', 'port',
+    'mine', 'river', 'island', 'mountain', 'aqueduct', 'theatre', 'tomb']
+# roughly the Mediterranean and its hinterland
+LATITUDES = (25.0, 50.0)
+LONGITUDES = (-10.0, 45.0)
+logger = logging.getLogger(__name__)
+
+
+class SyntheticPlace:
+
+    def __init__(self, pid: str, title: str, names: list, last_modified: str,
+                 description: str, repr_point=None, periods=None):
+        self.id = pid
+        self.title = title
+        self.names = names
+        self.last_modified = last_modified
+        self.description = description
+        self.repr_point = repr_point
+        self.periods = periods or []
+
+    @property
+    def uri(self):
+        return 'https://pleiades.stoa.org/places/{}'.format(self.id)
+
+    def __str__(self):
+        return '\n\n'.join((self.title, self.description, self.uri))
+
+
+class SyntheticCollection:
+    """Just enough of a walker place collection for the brain."""
+
+    def __init__(self, places: list):
+        self.places = {p.id: p for p in places}
+
+    def get(self, key: str, value=None):
+        if key == 'id':
+            place = self.places.get(value)
+            return [] if place is None else [place]
+        if key == 'last_modified':
+            latest = max([p.last_modified for p in self.places.values()])
+            return [
+                p for p in self.places.values() if p.last_modified == latest]
+        value = value.lower()
+        results = []
+        for place in self.places.values():
+            names = [n.lower() for n in [place.title] + place.names]
+            if key == 'name' and value in names:
+                results.append(place)
+            elif key == 'in_name' and any([value in n for n in names]):
+                results.append(place)
+        return results
+
+
+def make_name(r: random.Random):
+    return ''.join(
+        [r.choice(SYLLABLES) for i in range(r.randint(2, 4))]).capitalize()
+
+
+def make_places(count: int, seed=0):
+    """Return (count, collection) shaped like PleiadesWalker.walk()."""
+    r = random.Random(seed)
+    # points come from their own stream so names stay as they always were
+    spread = random.Random('points {}'.format(seed))
+    ages = random.Random('periods {}'.format(seed))
+    period_keys = list(TIME_PERIODS)
+    places = []
+    for i in range(count):
+        title = make_name(r)
+        if r.random() < 0.3:
+            title = '{} {}'.format(r.choice(FEATURES).capitalize(), title)
+        if r.random() < 0.2:
+            title = '{} {}'.format(title, make_name(r))
+        names = [make_name(r) for j in range(r.randint(0, 3))]
+        last_modified = '20{:02d}-{:02d}-{:02d}T00:00:00Z'.format(
+            r.randint(10, 18), r.randint(1, 12), r.randint(1, 28))
+        description = 'An ancient {} attested as {}.'.format(
+            r.choice(FEATURES), ', '.join([title] + names))
+        repr_point = [
+            round(spread.uniform(*LONGITUDES), 5),
+            round(spread.uniform(*LATITUDES), 5)]
+        first = ages.randrange(len(period_keys))
+        periods = period_keys[first:first + ages.randint(1, 3)]
+        places.append(SyntheticPlace(
+            str(100000 + i), title, names, last_modified, description,
+            repr_point, periods))
+    logger.debug('made {} synthetic places'.format(count))
+    return count, SyntheticCollection(places)
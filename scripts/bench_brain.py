@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark each Brain query class against a synthetic Pleiades-scale
+collection.
+"""
+
+from airtight.cli import configure_commandline
+import json
+import logging
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.synthetic import make_name, make_places
+import random
+from time import perf_counter
+from timeit import repeat
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-n', '--size', 40000, 'synthetic places in the collection', False],
+    ['-q', '--queries', 50, 'distinct queries per class', False],
+    ['-o', '--output', '', 'write results to this JSON file', False],
+    ['-b', '--baseline', '',
+        'compare with results previously written by --output', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+
+logger = logging.getLogger(__name__)
+
+
+def name_tokens(brain: Brain, count: int, r: random.Random):
+    """Count tokens, mostly drawn from one place's names."""
+    place = brain.places[r.choice(list(brain.places))]
+    words = ' '.join([place.title] + list(place.names)).lower().split()
+    tokens = words[:count]
+    while len(tokens) < count:
+        tokens.append(make_name(r).lower())
+    return tokens
+
+
+def misspell(tokens: list, r: random.Random):
+    """Change one letter in each token long enough to be matched fuzzily."""
+    misspelled = []
+    for token in tokens:
+        if len(token) > 4:
+            i = r.randrange(1, len(token))
+            token = token[:i] + r.choice('aeiou') + token[i + 1:]
+        misspelled.append(token)
+    return misspelled
+
+
+def query_classes(brain: Brain, queries: int, seed=0):
+    """Return {class name: (callable, [argument, ...])}."""
+    r = random.Random(seed)
+    pids = list(brain.places)
+    classes = {
+        'clean': (brain._clean, [
+            'Please, what is the place named «{}»?'.format(make_name(r))
+            for i in range(queries)]),
+        'pid': (brain.answer, [r.choice(pids) for i in range(queries)]),
+        'list named': (brain.answer, [
+            'list named {}'.format(' '.join(name_tokens(brain, 1, r)))
+            for i in range(queries)]),
+        'latest': (brain.answer, ['latest'] * queries),
+        'list latest': (brain.answer, ['list latest'] * queries),
+        'fallback split': (
+            lambda q: brain._plan_named(q.split()), [
+                ' '.join(name_tokens(brain, 3, r)[::-1])
+                for i in range(queries)]),
+        'named fuzzy': (brain.answer, [
+            'named {}'.format(' '.join(misspell(name_tokens(brain, 1, r), r)))
+            for i in range(queries)]),
+        'near': (brain.answer, [
+            'near {}'.format(r.choice(pids)) for i in range(queries)]),
+        'near point': (brain.answer, [
+            'near {:.4f} {:.4f}'.format(
+                r.uniform(25.0, 50.0), r.uniform(-10.0, 45.0))
+            for i in range(queries)]),
+        'near within': (brain.answer, [
+            'near {} within 25 km'.format(r.choice(pids))
+            for i in range(queries)]),
+        'age named': (brain.answer, [
+            'how old {}'.format(r.choice(pids)) for i in range(queries)]),
+        'age active': (brain.answer, [
+            'active in {} bc'.format(r.randint(1, 800))
+            for i in range(queries)]),
+        'age between': (brain.answer, [
+            'between {} bc and ad {}'.format(
+                r.randint(1, 800), r.randint(1, 800))
+            for i in range(queries)]),
+    }
+    for count in range(1, 9):
+        classes['named {}'.format(count)] = (brain.answer, [
+            'named {}'.format(' '.join(name_tokens(brain, count, r)))
+            for i in range(queries)])
+    return classes
+
+
+def measure(func, arguments: list):
+    def one_pass():
+        for argument in arguments:
+            func(argument)
+    number = 3
+    best = min(repeat(one_pass, number=number, repeat=3))
+    return best / (number * len(arguments)) * 1e6
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    size = int(kwargs['size'])
+    start = perf_counter()
+    place_count, place_collection = make_places(size)
+    # no answer cache: every call should do the real work
+    brain = Brain(place_collection, cache_size=0)
+    print('built a brain for {} synthetic places in {:.2f} s'.format(
+        place_count, perf_counter() - start))
+    baseline = {}
+    if kwargs['baseline']:
+        with open(kwargs['baseline'], 'r') as f:
+            baseline = json.load(f)['results']
+    results = {}
+    for name, (func, arguments) in query_classes(
+            brain, int(kwargs['queries'])).items():
+        results[name] = measure(func, arguments)
+        line = '  {:16} {:12.1f} us'.format(name, results[name])
+        if name in baseline:
+            line += '   {:6.2f}x baseline'.format(
+                results[name] / baseline[name])
+        print(line)
+    if kwargs['output']:
+        with open(kwargs['output'], 'w') as f:
+            json.dump({'size': size, 'results': results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time catching up on a backlog of notifications after an outage, and check
+every mention in it is answered once, in order.
+
+Run from the repository root as: python -m scripts.bench_catchup
+"""
+
+from airtight.cli import configure_commandline
+from datetime import datetime
+import logging
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.synthetic import make_places
+import random
+from scripts.replay import (
+    LocalMastodon, paginate, read_log, ReplayTooter, write_log)
+import tempfile
+from time import perf_counter, sleep
+import tracemalloc
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-n', '--synthetic_count', 2000,
+        'how many synthetic places to answer from', False],
+    ['-g', '--backlog', 5000, 'notifications waiting after the outage',
+        False],
+    ['-m', '--mentions', 0.2, 'fraction of the backlog that are mentions',
+        False],
+    ['-d', '--delay', 0.05, 'simulated seconds per API request', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+OTHER_TYPES = ['favourite', 'reblog', 'follow']
+
+logger = logging.getLogger(__name__)
+
+
+class BacklogMastodon(LocalMastodon):
+    """Stand-in API with a backlog, a delay per request and paging."""
+
+    def __init__(self, notifications: list, delay: float):
+        LocalMastodon.__init__(self, notifications)
+        self.delay = delay
+        self.requests = 0
+
+    def notifications(self, **kwargs):
+        self.requests += 1
+        sleep(self.delay)
+        return paginate(self.pending, **kwargs)
+
+
+def backlog(mentions: list, count: int, fraction: float, seed=0):
+    """Mentions interleaved with other notifications, numbered in order."""
+    r = random.Random(seed)
+    mentions = iter(mentions)
+    notifications = []
+    for i in range(count):
+        if r.random() < fraction:
+            n = dict(next(mentions))
+        else:
+            acct = 'user{}@example.org'.format(r.randint(1, 50))
+            n = {
+                'type': r.choice(OTHER_TYPES),
+                'created_at': datetime(2018, 5, 11),
+                'account': {'acct': acct, 'display_name': acct}}
+        n['id'] = str(i + 1)
+        notifications.append(n)
+    return notifications
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    place_count, place_collection = make_places(
+        int(kwargs['synthetic_count']))
+    brain = Brain(place_collection)
+    count = int(kwargs['backlog'])
+    with tempfile.NamedTemporaryFile(suffix='.jsonl') as log:
+        write_log(log.name, count, brain)
+        mentions = read_log(log.name)
+    notifications = backlog(mentions, count, float(kwargs['mentions']))
+    api = BacklogMastodon(notifications, float(kwargs['delay']))
+    tooter = ReplayTooter(brain, api)
+    tracemalloc.start()
+    start = perf_counter()
+    since_id = tooter._catch_up('0')
+    elapsed = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    expected = [n['id'] for n in notifications if n['type'] == 'mention']
+    answered = []
+    for post in api.posted:
+        reply_to = post['in_reply_to_id']
+        if reply_to is not None and reply_to not in answered[-1:]:
+            answered.append(reply_to)
+    print('caught up on {} notifications ({} mentions) in {:.3f} s'.format(
+        count, len(expected), elapsed))
+    print('  API requests: {:6}'.format(api.requests))
+    print('  peak memory: {:8.1f} KiB'.format(peak / 2**10))
+    print('  since_id now: {}'.format(since_id))
+    print('  answered in order: {}'.format(answered == expected))
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark: per-question directive dispatch, old loop vs compiled.
+"""
+
+from airtight.cli import configure_commandline
+import logging
+from pleiades.mastodon.brain import directives, dispatch
+from timeit import repeat
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-n', '--number', 20000, 'passes over the question sample', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+QUESTIONS = [
+    'list latest',
+    'list most recent',
+    'named athenae',
+    'called roma quadrata',
+    'pid 579885',
+    'pleiades uri https://pleiades.stoa.org/places/579885',
+    'list named ephesos',
+    'list pid 579885 423025',
+    'most recently modified',
+    'latest',
+    'how old athenae',
+    'when tarraco',
+    'athenae',
+    'temple of apollo at delphi',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def legacy_dispatch(clean_question: str):
+    """The nested trigger/matcher loop Brain.answer used to run."""
+    for key, directive in directives.items():
+        logger.debug('directive key: {}'.format(key))
+        for trigger in directive['triggers']:
+            logger.debug('trigger: {}'.format(trigger))
+            if trigger in clean_question:
+                for matcher in directive['matchers']:
+                    logger.debug('matcher: {}'.format(matcher.pattern))
+                    m = matcher.match(clean_question)
+                    if m is not None:
+                        logger.debug('match')
+                        try:
+                            tokens = m.group('tokens').split()
+                        except IndexError:
+                            tokens = []
+                        return directive['handler'], tokens
+                    else:
+                        logger.debug('miss')
+    return None
+
+
+def run(func, number):
+    def one_pass():
+        for question in QUESTIONS:
+            func(question)
+    best = min(repeat(one_pass, number=number, repeat=5))
+    return best / (number * len(QUESTIONS)) * 1e6
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    number = int(kwargs['number'])
+    for question in QUESTIONS:
+        if legacy_dispatch(question) != dispatch(question):
+            raise RuntimeError(
+                'dispatch disagrees on "{}"'.format(question))
+    before = run(legacy_dispatch, number)
+    after = run(dispatch, number)
+    print('per-question dispatch over {} questions:'.format(len(QUESTIONS)))
+    print('  nested loop: {:8.3f} us'.format(before))
+    print('  compiled:    {:8.3f} us'.format(after))
+    print('  speedup:     {:8.1f}x'.format(before / after))
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
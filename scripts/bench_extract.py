@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare the mention text extractor with the full BeautifulSoup parse it
+replaced: check it reads the same query out of each status as a soup with
+the same links taken out, count where it differs from the old '@' word
+filter, and time both.
+
+Run from the repository root as: python -m scripts.bench_extract
+"""
+
+from airtight.cli import configure_commandline
+from bs4 import BeautifulSoup
+import logging
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.content import extract_query
+from pleiades.mastodon.synthetic import make_places
+from scripts.replay import read_log, write_log
+import tempfile
+from time import perf_counter
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-j', '--log_path', '',
+        'JSONL of recorded notifications to add to the corpus', False],
+    ['-g', '--generate', 2000, 'synthetic mentions to add to the corpus',
+        False],
+    ['-r', '--repeat', 5, 'times to extract from the whole corpus', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+# status HTML as Mastodon (and servers federating with it) deliver it
+CORPUS = [
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span> Athens</p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention" rel="nofollow noopener noreferrer" '
+    'target="_blank">@<span>pleiades</span></a></span> where is '
+    'Ephesos?</p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span> how old is '
+    'Nicopolis ad Istrum &amp; what&#39;s near it?</p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span> <span '
+    'class="h-card"><a href="https://mastodon.social/@sfsheath" '
+    'class="u-url mention">@<span>sfsheath</span></a></span> list named '
+    'Alexandria</p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span> near '
+    '37.97 23.72</p><p>thanks!</p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span><br />'
+    'pid 579885</p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span> Ἀθῆναι</p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span> what is '
+    '<a href="https://pleiades.stoa.org/places/579885" rel="nofollow '
+    'noopener noreferrer" target="_blank"><span class="invisible">'
+    'https://</span><span class="ellipsis">pleiades.stoa.org/places/'
+    '57988</span><span class="invisible">5</span></a></p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span> latest '
+    '<a href="https://botsin.space/tags/PleiadesGazetteer" '
+    'class="mention hashtag" rel="tag">#<span>PleiadesGazetteer</span>'
+    '</a></p>',
+    '<p><a href="https://botsin.space/tags/archaeology" class="mention '
+    'hashtag" rel="nofollow noopener noreferrer" target="_blank">#<span>'
+    'archaeology</span></a> <span class="h-card"><a href="https://'
+    'botsin.space/@pleiades" class="u-url mention">@<span>pleiades</span>'
+    '</a></span> what was active in 300 bc</p>',
+    '<p><span class="h-card"><a class="u-url mention" '
+    'data-user="9xAbc" href="https://botsin.space/@pleiades" '
+    'rel="ugc">@<span>pleiades</span></a></span> superluminal</p>',
+    '<p><a href="https://botsin.space/@pleiades" class="u-url mention">'
+    '@pleiades@botsin.space</a> ping</p>',
+    '<p><span class="h-card"><a href="https://botsin.space/@pleiades" '
+    'class="u-url mention">@<span>pleiades</span></a></span> '
+    '<a href="https://example.net/tags/roman" rel="tag">#roman</a> '
+    'Londinium</p>',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def soup_query(html: str):
+    """The query as the bot used to read it, through BeautifulSoup."""
+    soup = BeautifulSoup(html, 'html.parser')
+    query = soup.get_text()
+    words = query.split()
+    return ' '.join([w for w in words if not w.startswith('@')])
+
+
+def soup_structural(html: str):
+    """A full parse with mention and hashtag links taken out."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for a in soup.find_all('a'):
+        classes = a.get('class') or []
+        if 'mention' in classes or 'hashtag' in classes or (
+                'tag' in (a.get('rel') or [])):
+            a.decompose()
+    return ' '.join(soup.get_text().split())
+
+
+def time_extract(func, corpus: list, repeat: int):
+    start = perf_counter()
+    for i in range(repeat):
+        for html in corpus:
+            func(html)
+    return (perf_counter() - start) / (repeat * len(corpus))
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    corpus = list(CORPUS)
+    if kwargs['log_path']:
+        corpus.extend([
+            n['status']['content'] for n in read_log(kwargs['log_path'])
+            if n['type'] == 'mention'])
+    if int(kwargs['generate']) > 0:
+        place_count, place_collection = make_places(1000)
+        with tempfile.NamedTemporaryFile(suffix='.jsonl') as log:
+            write_log(log.name, int(kwargs['generate']), Brain(
+                place_collection))
+            corpus.extend([
+                n['status']['content'] for n in read_log(log.name)])
+    identical = 0
+    changed = []
+    for html in corpus:
+        actual = extract_query(html)
+        if actual == soup_structural(html):
+            identical += 1
+        else:
+            print('  differs from the soup: {!r}'.format(html))
+        if actual != soup_query(html):
+            changed.append((soup_query(html), actual))
+    print('{} statuses, {} read identically'.format(len(corpus), identical))
+    print('  {} read differently than the old word filter did:'.format(
+        len(changed)))
+    for old, new in changed[:10]:
+        print('    {!r} -> {!r}'.format(old, new))
+    repeat = int(kwargs['repeat'])
+    soup_time = time_extract(soup_query, corpus, repeat)
+    extract_time = time_extract(extract_query, corpus, repeat)
+    print('  soup:    {:8.1f} us per status'.format(soup_time * 1e6))
+    print('  extract: {:8.1f} us per status'.format(extract_time * 1e6))
+    if extract_time:
+        print('  {:.1f}x faster'.format(soup_time / extract_time))
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare the memory held by walked places with their compact store, and
+check that a brain answers the same from either.
+"""
+
+from airtight.cli import configure_commandline
+import gc
+import logging
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.places import iter_places
+from pleiades.mastodon.store import compact, footprint
+from pleiades.mastodon.synthetic import make_name, make_places
+import random
+import tracemalloc
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-j', '--json_path', '',
+        'Pleiades JSON tree to walk (default: synthetic places)', False],
+    ['-n', '--size', 40000, 'synthetic places in the collection', False],
+    ['-q', '--queries', 500, 'questions to compare answers on', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+QUESTION_TEMPLATES = [
+    '{name}', 'named {name}', 'list named {name}', '{pid}', 'latest',
+    'how old {pid}', 'near {pid}', 'in 300 bc']
+
+logger = logging.getLogger(__name__)
+
+
+def load(kwargs: dict):
+    """Walked (not compacted) places, from JSON or made up."""
+    if kwargs['json_path']:
+        from pleiades.walker.walker import PleiadesWalker
+        return PleiadesWalker(path=kwargs['json_path']).walk()
+    return make_places(int(kwargs['size']))
+
+
+def allocated(func, *args):
+    """Return (result, bytes still allocated by func once it returns)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def answers(brain: Brain, questions: list):
+    results = []
+    for i, question in enumerate(questions):
+        # _handle_multiples picks at random; pick the same way for both
+        random.seed(i)
+        results.append(brain.answer(question))
+    return results
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    (place_count, walked), walked_size = allocated(load, kwargs)
+    compacted, compact_size = allocated(compact, walked)
+    print('{} places'.format(place_count))
+    line = '  {:8} {:10.1f} MiB allocated, {:10.1f} MiB by getsizeof'
+    print(line.format(
+        'walked:', walked_size / 2**20, footprint(walked) / 2**20))
+    print(line.format(
+        'compact:', compact_size / 2**20, compacted.footprint() / 2**20))
+    if compact_size:
+        print('  {:.1f}x smaller'.format(walked_size / compact_size))
+    r = random.Random(0)
+    pids = [p.id for p in iter_places(compacted)]
+    questions = [
+        r.choice(QUESTION_TEMPLATES).format(
+            name=make_name(r), pid=r.choice(pids))
+        for i in range(int(kwargs['queries']))]
+    expected = answers(Brain(walked, cache_size=0), questions)
+    actual = answers(Brain(compacted, cache_size=0), questions)
+    differing = [
+        q for q, e, a in zip(questions, expected, actual) if e != a]
+    print('  {} of {} answers differ'.format(len(differing), len(questions)))
+    for question in differing[:10]:
+        print('    {}'.format(question))
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
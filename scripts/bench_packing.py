@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: fitting long place descriptions into toots, old vs packing.
+"""
+
+from airtight.cli import configure_commandline
+import logging
+from pleiades.mastodon.packing import pack, toot_length
+import random
+from timeit import repeat
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-n', '--number', 20, 'passes over the description sample', False],
+    ['-s', '--size', 20000,
+        'characters in the longest description line', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+MAXIMUM = 488
+WORDS = [
+    'settlement', 'temple', 'sanctuary', 'Roman', 'Hellenistic', 'fort',
+    'river', 'bridge', 'attested', 'inscription', 'coins', 'of', 'the',
+    'and', 'near', 'https://pleiades.stoa.org/places/579885']
+
+logger = logging.getLogger(__name__)
+
+
+def describe(size: int, r: random.Random):
+    """A place-like answer: title, long description, uri."""
+    description = []
+    length = 0
+    while length < size:
+        word = r.choice(WORDS)
+        description.append(word)
+        length += len(word) + 1
+    return '\n\n'.join((
+        'Example Place', ' '.join(description),
+        'https://pleiades.stoa.org/places/123456'))
+
+
+def legacy_truncate(raw: str, maximum: int):
+    """The word-popping loop Tooter._cook_answer used to run."""
+    reduce_by = len(raw) - maximum
+    chunks = [(i, c, len(c)) for i, c in enumerate(raw.split('\n\n'))]
+    chunks.sort(key=lambda tup: tup[2])
+    chunk_i, chunk, chunk_len = chunks[-1]
+    lines = [
+        (i, line, len(line)) for i, line in enumerate(chunk.split('\n'))]
+    lines.sort(key=lambda tup: tup[2])
+    line_i, line, line_len = lines[-1]
+    if line_len <= reduce_by:
+        raise RuntimeError('the answer will be eliminated')
+    goal = line_len - reduce_by
+    words = line.split()
+    while True:
+        words = words[:-1]
+        line = ' '.join(words)
+        if len(line) <= goal - 3:
+            line += '...'
+            break
+    lines[-1] = (line_i, line, len(line))
+    lines.sort(key=lambda tup: tup[0])
+    chunk = '\n'.join([line for line_i, line, line_len in lines])
+    chunks[-1] = (chunk_i, chunk, len(chunk))
+    chunks.sort(key=lambda tup: tup[0])
+    return '\n\n'.join([chunk for chunk_i, chunk, chunk_len in chunks])
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    number = int(kwargs['number'])
+    size = int(kwargs['size'])
+    r = random.Random(0)
+    sizes = [size // 8, size // 4, size // 2, size]
+    texts = [describe(s, r) for s in sizes]
+    print('fitting answers into {}-character toots:'.format(MAXIMUM))
+    for s, text in zip(sizes, texts):
+        before = min(repeat(
+            lambda: legacy_truncate(text, MAXIMUM), number=number,
+            repeat=3)) / number
+        pack.cache_clear()
+        after = min(repeat(
+            lambda: pack.__wrapped__(text, MAXIMUM), number=number,
+            repeat=3)) / number
+        parts = pack(text, MAXIMUM)
+        assert all(toot_length(p) <= MAXIMUM for p in parts)
+        print(
+            '  {:>7} chars: word-popping {:10.3f} ms   packing {:8.3f} ms '
+            '({} toots, nothing dropped)'.format(
+                len(text), before * 1e3, after * 1e3, len(parts)))
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
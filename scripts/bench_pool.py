@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure what each forked worker adds to memory when several answer from
+one brain in the main process, as scripts.tooter_pool runs them, or (with
+--direct) each from its copy-on-write view of that brain.
+
+Run from the repository root as: python -m scripts.bench_pool
+"""
+
+from airtight.cli import configure_commandline
+from functools import partial
+import json
+import logging
+import multiprocessing
+import os
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.pool import BrainServer, memory_usage, Supervisor
+from pleiades.mastodon.synthetic import make_name, make_places
+import random
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-n', '--size', 40000, 'synthetic places in the collection', False],
+    ['-a', '--accounts', 4, 'workers to fork', False],
+    ['-q', '--queries', 2000, 'questions each worker answers', False],
+    ['-d', '--direct', False,
+        'answer in each worker rather than in the supervisor', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+QUESTION_TEMPLATES = [
+    '{name}', 'named {name}', 'list named {name}', '{pid}', 'latest',
+    'how old {pid}', 'near {pid}', 'in 300 bc']
+
+logger = logging.getLogger(__name__)
+
+
+def answer(brain, pids: list, queries: int, seed: int, report: int,
+           barrier):
+    """Answer made-up questions, then report this worker's memory."""
+    r = random.Random(seed)
+    for i in range(queries):
+        brain.answer(r.choice(QUESTION_TEMPLATES).format(
+            name=make_name(r), pid=r.choice(pids)))
+    # measure while every worker is alive, so pages they share still count
+    # as shared
+    barrier.wait()
+    os.write(report, (json.dumps(memory_usage()) + '\n').encode('utf-8'))
+    barrier.wait()
+
+
+def mib(size):
+    return '{:8.1f} MiB'.format(size / 2**20)
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    if memory_usage() is None:
+        print('needs /proc/self/smaps_rollup (Linux)')
+        return
+    place_count, place_collection = make_places(int(kwargs['size']))
+    brain = Brain(place_collection)
+    before = memory_usage()
+    read, write = os.pipe()
+    accounts = int(kwargs['accounts'])
+    pids = list(brain.places)
+    server = BrainServer(brain)
+    barrier = multiprocessing.Barrier(accounts)
+    targets = {}
+    for i in range(accounts):
+        asked = brain if kwargs['direct'] else server.client()
+        targets['worker{}'.format(i)] = partial(
+            answer, asked, pids, int(kwargs['queries']), i, write, barrier)
+    supervisor = Supervisor(targets).spawn()
+    server.start()
+    Supervisor.wait(supervisor)
+    server.stop()
+    os.close(write)
+    with os.fdopen(read, 'r') as f:
+        workers = [json.loads(line) for line in f]
+    after = memory_usage()
+    print('{} places, {} workers'.format(place_count, len(workers)))
+    print('  brain server resident: {} before, {} after'.format(
+        mib(before['Rss']), mib(after['Rss'])))
+    for usage in workers:
+        print('  worker resident: {}, copied {}'.format(
+            mib(usage['Rss']), mib(usage['Private_Dirty'])))
+    print('  {} workers copied {} in all'.format(
+        len(workers), mib(sum([u['Private_Dirty'] for u in workers]))))
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
@@ -5,10 +5,13 @@ Command line interface to the bot.
 """
 
 from airtight.cli import configure_commandline
+import json
 import logging
-from os.path import abspath, realpath
+import multiprocessing
+import os
 from pleiades.mastodon.brain import Brain
-from pleiades.walker.walker import PleiadesWalker
+from pleiades.mastodon.snapshot import DEFAULT_SNAPSHOT_PATH, load_places
+import sys
 
 
 DEFAULT_LOG_LEVEL = logging.WARNING
@@ -22,14 +25,75 @@ OPTIONAL_ARGUMENTS = [
     ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
         False],
     ['-w', '--veryverbose', False,
-        'very verbose output (logging level == DEBUG)', False]
+        'very verbose output (logging level == DEBUG)', False],
+    ['-p', '--snapshot_path', DEFAULT_SNAPSHOT_PATH,
+        'where to cache walked place data', False],
+    ['-r', '--rebuild_snapshot', False,
+        'walk the JSON tree and rewrite the place snapshot', False],
+    ['-b', '--no_snapshot', False,
+        'walk the JSON tree without reading or writing the snapshot', False],
+    ['-i', '--input', '',
+        'answer questions from this file ("-" for stdin), one per line or '
+        'JSONL with a "question" key, instead of prompting', False],
+    ['-o', '--output', '-',
+        'where to write batch answers as JSONL ("-" for stdout)', False],
+    ['-j', '--jobs', os.cpu_count() or 1,
+        'worker processes for batch answering', False]
 ]
 POSITIONAL_ARGUMENTS = [
     # each row is a list with 3 elements: name, type, help text
     ['json_path', str, 'path to Pleiades JSON tree']
 ]
 
+BATCH_CHUNK_SIZE = 64
+
 logger = logging.getLogger(__name__)
+# set before the batch pool forks, so every worker shares the loaded brain
+_brain = None
+
+
+def _answer(question):
+    return question, _brain.answer(question)
+
+
+def read_questions(f):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            yield json.loads(line)['question']
+        else:
+            yield line
+
+
+def batch(brain, questions, out, jobs: int):
+    """
+    Answer questions, writing one JSON object per line in input order.
+
+    With more than one job, worker processes are forked after the place
+    data is loaded, so they share it copy-on-write rather than reloading.
+    """
+    global _brain
+    _brain = brain
+    count = 0
+    if jobs > 1:
+        pool = multiprocessing.get_context('fork').Pool(jobs)
+        results = pool.imap(_answer, questions, BATCH_CHUNK_SIZE)
+    else:
+        pool = None
+        results = map(_answer, questions)
+    try:
+        for question, answers in results:
+            out.write(json.dumps(
+                {'question': question, 'answers': answers},
+                ensure_ascii=False) + '\n')
+            count += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return count
 
 
 def main(**kwargs):
@@ -37,12 +101,32 @@ def main(**kwargs):
     main function
     """
     # logger = logging.getLogger(sys._getframe().f_code.co_name)
-    print('I am learning ...')
-    path = abspath(realpath(kwargs['json_path']))
-    walker = PleiadesWalker(path=path)
-    place_count, place_collection = walker.walk()
+    interactive = not kwargs['input']
+    # keep stdout clean for batch answers
+    status = sys.stdout if interactive else sys.stderr
+    print('I am learning ...', file=status)
+    place_count, place_collection = load_places(
+        kwargs['json_path'], kwargs['snapshot_path'],
+        rebuild=kwargs['rebuild_snapshot'], bypass=kwargs['no_snapshot'])
     brain = Brain(place_collection)
-    print('done. I know things about {} Pleiades places'.format(place_count))
+    print(
+        'done. I know things about {} Pleiades places'.format(place_count),
+        file=status)
+    if not interactive:
+        fin = sys.stdin if kwargs['input'] == '-' else open(
+            kwargs['input'], 'r', encoding='utf-8')
+        fout = sys.stdout if kwargs['output'] == '-' else open(
+            kwargs['output'], 'w', encoding='utf-8')
+        try:
+            count = batch(
+                brain, read_questions(fin), fout, int(kwargs['jobs']))
+        finally:
+            if fin is not sys.stdin:
+                fin.close()
+            if fout is not sys.stdout:
+                fout.close()
+        print('answered {} questions'.format(count), file=status)
+        return
     print('Feel free to ask me a question.')
     while True:
         question = input('? ')
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kill the bot partway through a replay, restart it on the same checkpoint
+and check that no mention is answered twice.
+
+Run from the repository root as: python -m scripts.crash_replay
+"""
+
+from airtight.cli import configure_commandline
+import json
+import logging
+import multiprocessing
+import os
+from os.path import join
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.checkpoint import Checkpoint
+from pleiades.mastodon.synthetic import make_places
+import random
+from scripts.replay import (
+    LocalMastodon, paginate, read_log, ReplayTooter, write_log)
+import signal
+import sys
+import tempfile
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-n', '--synthetic_count', 2000,
+        'how many synthetic places to answer from', False],
+    ['-g', '--generate', 200, 'synthetic mentions per trial', False],
+    ['-t', '--trials', 20, 'kill and restart this many times', False],
+    ['-e', '--checkpoint_every', 50,
+        'notifications handled between checkpoint writes', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+
+logger = logging.getLogger(__name__)
+
+
+class DurableMastodon(LocalMastodon):
+    """
+    Stand-in API that pages like the real one, records every reply on
+    disk as it is posted, and SIGKILLs its own process at the
+    kill_after'th reply (just before or just after it lands).
+    """
+
+    def __init__(self, notifications: list, posted_path: str, life: int,
+                 kill_after=0, kill_before=False):
+        LocalMastodon.__init__(self, notifications)
+        self.posted_path = posted_path
+        self.life = life
+        self.kill_after = kill_after
+        self.kill_before = kill_before
+        self.replies = 0
+
+    def notifications(self, **kwargs):
+        return paginate(self.pending, **kwargs)
+
+    def status_post(self, status, in_reply_to_id=None, **kwargs):
+        if in_reply_to_id is None:
+            return LocalMastodon.status_post(self, status)
+        self.replies += 1
+        if self.replies == self.kill_after and self.kill_before:
+            os.kill(os.getpid(), signal.SIGKILL)
+        with open(self.posted_path, 'a') as f:
+            f.write(json.dumps(
+                {'life': self.life, 'in_reply_to_id': in_reply_to_id}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        if self.replies == self.kill_after:
+            os.kill(os.getpid(), signal.SIGKILL)
+        return {'id': self.replies}
+
+
+def run(brain: Brain, notifications: list, workdir: str, life: int,
+        checkpoint_every: int, kill_after=0, kill_before=False):
+    """One life of the bot, handling notifications as Tooter.listen does."""
+    sys.stdout = open(os.devnull, 'w')
+    api = DurableMastodon(
+        notifications, join(workdir, 'posted.jsonl'), life, kill_after,
+        kill_before)
+    checkpoint = Checkpoint(
+        join(workdir, 'since_id.txt'), checkpoint_every, 3600.0)
+    tooter = ReplayTooter(brain, api, checkpoint)
+    since_id = tooter._read_since_id()
+    tooter._catch_up(since_id)
+    checkpoint.close()
+
+
+def trial(brain: Brain, notifications: list, r: random.Random,
+          checkpoint_every: int):
+    """Return (replies killed after, duplicated ids, unanswered ids)."""
+    context = multiprocessing.get_context('fork')
+    with tempfile.TemporaryDirectory(prefix='crash-replay-') as workdir:
+        with open(join(workdir, 'since_id.txt'), 'w') as f:
+            f.write('0\n')
+        kill_after = r.randint(1, len(notifications))
+        for i, kill in enumerate([kill_after, 0]):
+            process = context.Process(target=run, args=(
+                brain, notifications, workdir, i, checkpoint_every, kill,
+                r.random() < 0.5))
+            process.start()
+            process.join()
+            if kill and process.exitcode not in [-signal.SIGKILL, 0]:
+                raise RuntimeError('life {} failed'.format(i))
+            if not kill and process.exitcode != 0:
+                raise RuntimeError('restart failed')
+        lives = {}
+        with open(join(workdir, 'posted.jsonl'), 'r') as f:
+            for line in f:
+                post = json.loads(line)
+                lives.setdefault(post['in_reply_to_id'], set()).add(
+                    post['life'])
+    duplicated = [nid for nid, seen in lives.items() if len(seen) > 1]
+    unanswered = [n['id'] for n in notifications if n['id'] not in lives]
+    return kill_after, duplicated, unanswered
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    place_count, place_collection = make_places(
+        int(kwargs['synthetic_count']))
+    brain = Brain(place_collection)
+    with tempfile.NamedTemporaryFile(suffix='.jsonl') as log:
+        write_log(log.name, int(kwargs['generate']), brain)
+        notifications = read_log(log.name)
+    r = random.Random(0)
+    failures = 0
+    for i in range(int(kwargs['trials'])):
+        kill_after, duplicated, unanswered = trial(
+            brain, notifications, r, int(kwargs['checkpoint_every']))
+        print(
+            'killed at reply {:4}: {} answered twice, {} never '
+            'answered'.format(kill_after, len(duplicated), len(unanswered)))
+        if duplicated:
+            failures += 1
+    print('{} of {} trials answered a mention twice'.format(
+        failures, int(kwargs['trials'])))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pre-render the superluminal easter egg's figlet art to a small artifact
+that the brain reads instead of parsing fonts at answer time.
+"""
+
+from airtight.cli import configure_commandline
+import logging
+from pleiades.mastodon.packing import REPLY_MAX_CHARS
+from pleiades.mastodon.superluminal import (
+    DEFAULT_ARTIFACT_PATH, DEFAULT_PER_TEXT, prerender, write_artifact)
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-o', '--output', DEFAULT_ARTIFACT_PATH, 'where to write the artifact',
+        False],
+    ['-n', '--per_text', DEFAULT_PER_TEXT,
+        'renderings to keep for each superfluity', False],
+    ['-m', '--max_chars', REPLY_MAX_CHARS,
+        'longest rendering to keep, in toot characters', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+
+logger = logging.getLogger(__name__)
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    max_chars = int(kwargs['max_chars'])
+    renderings = prerender(int(kwargs['per_text']), max_chars)
+    write_artifact(kwargs['output'], renderings, max_chars)
+    print('wrote {} renderings of {} superfluities to {}'.format(
+        sum([len(v) for v in renderings.values()]), len(renderings),
+        kwargs['output']))
+    for text, kept in sorted(renderings.items()):
+        if not kept:
+            print('  nothing fits for {!r}; it will be answered plain'.format(
+                text))
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
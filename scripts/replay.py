@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline replay of recorded notifications through the whole bot.
+
+Run from the repository root as: python -m scripts.replay LOG.jsonl
+"""
+
+from airtight.cli import configure_commandline
+from datetime import datetime
+import json
+import logging
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.checkpoint import Checkpoint, newer
+from pleiades.mastodon.ratelimit import TokenBucket
+from pleiades.mastodon.snapshot import load_places
+from pleiades.mastodon.synthetic import make_name, make_places
+import random
+from scripts.tooter_supervised import MAX_REPLY_PARTS, Tooter
+from time import perf_counter
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-j', '--json_path', '',
+        'Pleiades JSON tree to answer from (default: synthetic places)',
+        False],
+    ['-n', '--synthetic_count', 40000,
+        'how many synthetic places to answer from', False],
+    ['-r', '--repeat', 1, 'times to replay the log', False],
+    ['-g', '--generate', 0,
+        'first write this many synthetic mentions to the log', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+    ['notifications_path', str, 'JSONL file of recorded notifications']
+]
+STAGES = ['extract', 'answer', 'cook', 'post']
+QUESTION_TEMPLATES = [
+    '{name}', 'named {name}', 'list named {name}', 'pid {pid}', '{pid}',
+    'latest', 'list latest', 'ping', 'how old {name}', 'where is {name}',
+    'near {pid}', 'what was active in 300 bc']
+DEFAULT_PAGE_SIZE = 40
+
+logger = logging.getLogger(__name__)
+
+
+def paginate(notifications: list, since_id=None, min_id=None, max_id=None,
+             limit=None):
+    """
+    The page of notifications (given oldest first) that the API would
+    return for these paging arguments, newest first.
+    """
+    limit = DEFAULT_PAGE_SIZE if limit is None else int(limit)
+    selected = [
+        n for n in notifications
+        if newer(n['id'], since_id) and newer(n['id'], min_id) and
+        (max_id is None or newer(max_id, n['id']))]
+    if min_id is not None:
+        return selected[:limit][::-1]
+    return selected[::-1][:limit]
+
+
+class LocalMastodon:
+    """In-process stand-in for the parts of the Mastodon API we use."""
+
+    ratelimit_limit = None
+    ratelimit_remaining = None
+    ratelimit_reset = None
+
+    def __init__(self, notifications=()):
+        self.pending = list(notifications)
+        self.posted = []
+
+    def notifications(self, limit=None, **kwargs):
+        # pending is what has not been read yet, so each page is the oldest
+        count = len(self.pending) if limit is None else int(limit)
+        page, self.pending = self.pending[:count], self.pending[count:]
+        return page[::-1]
+
+    def status_post(self, status, in_reply_to_id=None, **kwargs):
+        self.posted.append({
+            'id': len(self.posted) + 1, 'content': status,
+            'in_reply_to_id': in_reply_to_id})
+        return self.posted[-1]
+
+
+class ReplayTooter(Tooter):
+    """A Tooter that approves everything and times each stage."""
+
+    def __init__(self, brain: Brain, api: LocalMastodon, checkpoint=None):
+        self.timings = {stage: 0.0 for stage in STAGES}
+        self.latencies = []
+        if checkpoint is None:
+            # kept in memory, so replays never touch the live checkpoint
+            checkpoint = Checkpoint(None)
+        Tooter.__init__(
+            self, silent=False, json_path=None, creds_path=None, brain=brain,
+            api=api, checkpoint=checkpoint)
+        # posting is local, so the instance's budget does not apply
+        self.limiter = TokenBucket(capacity=10**9, window=1.0)
+        api.posted = []
+
+    def _timed(self, stage, method, *args):
+        start = perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.timings[stage] += perf_counter() - start
+
+    def _handle_notification(self, n: dict):
+        if n['type'] != 'mention':
+            return
+        start = perf_counter()
+        self._handle_mention(n)
+        self.latencies.append(perf_counter() - start)
+
+    def _extract_query(self, d: dict):
+        return self._timed('extract', Tooter._extract_query, self, d)
+
+    def _answer(self, query_content: str):
+        return self._timed('answer', Tooter._answer, self, query_content)
+
+    def _cook_answer(self, raw, querent, max_parts=MAX_REPLY_PARTS):
+        return self._timed(
+            'cook', Tooter._cook_answer, self, raw, querent, max_parts)
+
+    def _amsg(self, msg, mute=False, in_reply_to_id=None):
+        return self._timed(
+            'post', self._post_quietly, msg, in_reply_to_id)
+
+    def _post_quietly(self, msg, in_reply_to_id):
+        self._call(self.api.status_post, msg, in_reply_to_id=in_reply_to_id)
+
+    def _review(self, d: dict, query_content: str, final_answers: list):
+        return True
+
+
+def read_log(path: str):
+    notifications = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            n = json.loads(line)
+            n['created_at'] = datetime.fromisoformat(n['created_at'])
+            notifications.append(n)
+    return notifications
+
+
+def write_log(path: str, count: int, brain: Brain, seed=0):
+    """Write count synthetic mentions shaped like Mastodon notifications."""
+    r = random.Random(seed)
+    pids = list(brain.places)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            question = r.choice(QUESTION_TEMPLATES).format(
+                name=make_name(r), pid=r.choice(pids))
+            acct = 'user{}@example.org'.format(r.randint(1, 50))
+            content = (
+                '<p><span class="h-card"><a href="https://botsin.space/'
+                '@pleiades" class="u-url mention">@<span>pleiades</span>'
+                '</a></span> {}</p>'.format(question))
+            f.write(json.dumps({
+                'id': str(i + 1), 'type': 'mention',
+                'created_at': datetime(2018, 5, 11).isoformat(),
+                'account': {'acct': acct, 'display_name': acct},
+                'status': {'id': str(i + 1), 'content': content}}) + '\n')
+
+
+def replay(tooter: ReplayTooter, api: LocalMastodon, notifications: list):
+    """Answer the whole log afresh, as if the bot had never seen it."""
+    tooter.checkpoint = Checkpoint(None)
+    api.pending = list(notifications)
+    for n in tooter._poll(None):
+        tooter._handle_notification(n)
+
+
+def percentile(values: list, fraction: float):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    if kwargs['json_path']:
+        place_count, place_collection = load_places(kwargs['json_path'])
+    else:
+        place_count, place_collection = make_places(
+            int(kwargs['synthetic_count']))
+    brain = Brain(place_collection)
+    if int(kwargs['generate']) > 0:
+        write_log(kwargs['notifications_path'], int(kwargs['generate']), brain)
+    notifications = read_log(kwargs['notifications_path'])
+    api = LocalMastodon()
+    tooter = ReplayTooter(brain, api)
+    start = perf_counter()
+    for i in range(int(kwargs['repeat'])):
+        replay(tooter, api, notifications)
+    elapsed = perf_counter() - start
+    mentions = len(tooter.latencies)
+    print('replayed {} mentions against {} places in {:.3f} s'.format(
+        mentions, place_count, elapsed))
+    print('  throughput: {:10.1f} mentions/s'.format(
+        mentions / elapsed if elapsed else 0.0))
+    print('  latency p50: {:9.3f} ms'.format(
+        percentile(tooter.latencies, 0.5) * 1e3))
+    print('  latency p99: {:9.3f} ms'.format(
+        percentile(tooter.latencies, 0.99) * 1e3))
+    for stage in STAGES:
+        print('  {:8} {:9.3f} s  ({:5.1%})'.format(
+            stage, tooter.timings[stage],
+            tooter.timings[stage] / elapsed if elapsed else 0.0))
+    print('  posted {} toots'.format(len(api.posted)))
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
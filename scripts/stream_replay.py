@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Replay synthetic mentions through a local stand-in for the streaming API,
+dropping the stream now and then (and failing the catch-up poll after a
+drop with a 503), and report reply latency, API calls and any mention
+missed or answered twice.
+
+Run from the repository root as: python -m scripts.stream_replay
+"""
+
+from airtight.cli import configure_commandline
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+from mastodon.Mastodon import MastodonServerError
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.stream import Backoff
+from pleiades.mastodon.synthetic import make_places
+import queue
+from scripts.replay import (
+    LocalMastodon, paginate, percentile, read_log, ReplayTooter, write_log)
+import sys
+import tempfile
+import threading
+from time import perf_counter, sleep
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    # each row is a list with 5 elements: short option, long option,
+    # default value, help text, required
+    ['-l', '--loglevel', 'NOTSET',
+        'desired logging level (' +
+        'case-insensitive string: DEBUG, INFO, WARNING, or ERROR',
+        False],
+    ['-v', '--verbose', False, 'verbose output (logging level == INFO)',
+        False],
+    ['-w', '--veryverbose', False,
+        'very verbose output (logging level == DEBUG)', False],
+    ['-n', '--synthetic_count', 2000,
+        'how many synthetic places to answer from', False],
+    ['-g', '--generate', 200, 'synthetic mentions to send', False],
+    ['-i', '--interval', 0.02, 'seconds between mentions', False],
+    ['-d', '--drop_every', 50,
+        'drop the stream after this many mentions (0 never)', False],
+    ['-u', '--unavailable', 1,
+        'catch-up polls answered with a 503 after each drop', False],
+    ['-b', '--heartbeat', 0.5, 'seconds between stream heartbeats', False],
+    ['-q', '--idle', 3.0,
+        'seconds to stay connected and idle after the last mention', False]
+]
+POSITIONAL_ARGUMENTS = [
+    # each row is a list with 3 elements: name, type, help text
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _event(notification: dict):
+    n = dict(notification)
+    n['created_at'] = n['created_at'].isoformat()
+    return 'event: notification\ndata: {}\n\n'.format(json.dumps(n))
+
+
+class StandinStream(ThreadingHTTPServer):
+    """
+    Local server-sent events endpoint shaped like the Mastodon user stream.
+
+    publish() sends a notification to every connected client; drop() ends
+    every open stream, as a flaky network or a restarting instance would.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, heartbeat: float, address=('127.0.0.1', 0)):
+        ThreadingHTTPServer.__init__(self, address, StandinHandler)
+        self.heartbeat = heartbeat
+        self.clients = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://{}:{}/api/v1/streaming/user'.format(
+            *self.server_address[:2])
+
+    def publish(self, notification: dict):
+        with self.lock:
+            for client in self.clients:
+                client.put(_event(notification))
+
+    def drop(self):
+        with self.lock:
+            for client in self.clients:
+                client.put(None)
+            self.clients = []
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        client = queue.Queue()
+        with self.server.lock:
+            self.server.clients.append(client)
+            self.server.connections += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                try:
+                    event = client.get(timeout=self.server.heartbeat)
+                except queue.Empty:
+                    event = ':thump\n'
+                if event is None:
+                    break
+                self.wfile.write(event.encode('utf-8'))
+                self.wfile.flush()
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class StreamMastodon(LocalMastodon):
+    """
+    Stand-in API whose notifications are those published so far, paged
+    like the real ones, and which notes when each mention is first
+    answered and any reply posted twice. While unavailable is above zero,
+    each notifications call counts it down and fails as a 503 would.
+    """
+
+    def __init__(self):
+        LocalMastodon.__init__(self)
+        self.calls = 0
+        self.published_at = {}
+        self.answered_at = {}
+        self.replies = set()
+        self.duplicated = set()
+        self.unavailable = 0
+        self.failures = 0
+
+    def publish(self, notification: dict):
+        self.published_at[notification['id']] = perf_counter()
+        self.pending.append(notification)
+
+    def notifications(self, **kwargs):
+        self.calls += 1
+        if self.unavailable > 0:
+            self.unavailable -= 1
+            self.failures += 1
+            raise MastodonServerError(
+                'Mastodon API returned error', 503, 'Service Unavailable',
+                None)
+        return paginate(self.pending, **kwargs)
+
+    def status_post(self, status, in_reply_to_id=None, **kwargs):
+        self.calls += 1
+        if in_reply_to_id is not None:
+            self.answered_at.setdefault(in_reply_to_id, perf_counter())
+            if (in_reply_to_id, status) in self.replies:
+                self.duplicated.add(in_reply_to_id)
+            self.replies.add((in_reply_to_id, status))
+        return LocalMastodon.status_post(self, status, in_reply_to_id)
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    place_count, place_collection = make_places(
+        int(kwargs['synthetic_count']))
+    brain = Brain(place_collection)
+    with tempfile.NamedTemporaryFile(suffix='.jsonl') as log:
+        write_log(log.name, int(kwargs['generate']), brain)
+        notifications = read_log(log.name)
+    server = StandinStream(float(kwargs['heartbeat']))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api = StreamMastodon()
+    tooter = ReplayTooter(brain, api)
+    tooter.stream_url = server.url
+    stopped = threading.Event()
+    listener = threading.Thread(target=tooter.listen_stream, kwargs={
+        'stopped': stopped, 'backoff': Backoff(initial=0.2, maximum=2.0)})
+    listener.start()
+    interval = float(kwargs['interval'])
+    drop_every = int(kwargs['drop_every'])
+    unavailable = int(kwargs['unavailable'])
+    sleep(0.5)
+    for i, n in enumerate(notifications):
+        if drop_every and i and i % drop_every == 0:
+            api.unavailable = unavailable
+            server.drop()
+        api.publish(n)
+        server.publish(n)
+        sleep(interval)
+    deadline = perf_counter() + 30.0
+    while (len(api.answered_at) < len(notifications) and
+           perf_counter() < deadline):
+        sleep(0.05)
+    calls = api.calls
+    sleep(float(kwargs['idle']))
+    idle_calls = api.calls - calls
+    stopped.set()
+    server.drop()
+    listener.join()
+    server.shutdown()
+    latencies = [
+        api.answered_at[nid] - api.published_at[nid]
+        for nid in api.answered_at]
+    missed = [
+        n['id'] for n in notifications if n['id'] not in api.answered_at]
+    print('streamed {} mentions against {} places'.format(
+        len(notifications), place_count))
+    print('  latency p50: {:9.3f} ms'.format(
+        percentile(latencies, 0.5) * 1e3))
+    print('  latency p99: {:9.3f} ms'.format(
+        percentile(latencies, 0.99) * 1e3))
+    print('  stream connections: {:2}'.format(server.connections))
+    print('  notification polls: {:2}'.format(api.calls - len(api.posted)))
+    print('  polls failed with 503: {:2}'.format(api.failures))
+    print('  API calls while idle: {}'.format(idle_calls))
+    print('  {} answered twice, {} never answered'.format(
+        len(api.duplicated), len(missed)))
+    sys.exit(1 if api.duplicated or missed else 0)
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
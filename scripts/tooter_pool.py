@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Several supervised bots, one per creds file, answering from one copy of
+the place data.
+
+The places are loaded and indexed once, in the main process, which answers
+every bot's questions; each bot is a worker, forked by a single-threaded
+supervisor process, that keeps only its own connection, checkpoint and
+metrics.
+
+Run from the repository root as:
+python -m scripts.tooter_pool -c data/one.json,data/two.json JSON_PATH
+"""
+
+from airtight.cli import configure_commandline
+from functools import partial
+import logging
+import multiprocessing
+import os
+from os.path import basename, dirname, exists, join, splitext
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.checkpoint import Checkpoint, DEFAULT_CHECKPOINT_PATH
+from pleiades.mastodon.metrics import Registry, serve
+from pleiades.mastodon.pool import BrainServer, Supervisor
+from pleiades.mastodon.reload import Reloader
+from pleiades.mastodon.snapshot import load_places, scan
+from scripts import tooter_supervised
+from scripts.tooter_supervised import listen, Tooter
+import sys
+
+DEFAULT_LOG_LEVEL = logging.WARNING
+OPTIONAL_ARGUMENTS = [
+    row for row in tooter_supervised.OPTIONAL_ARGUMENTS
+    if row[1] != '--creds_path'] + [
+    ['-c', '--creds_paths', 'data/creds.json',
+        'comma-separated creds files, one bot for each', False]
+]
+POSITIONAL_ARGUMENTS = tooter_supervised.POSITIONAL_ARGUMENTS
+
+logger = logging.getLogger(__name__)
+
+
+def account_name(creds_path: str):
+    return splitext(basename(creds_path))[0]
+
+
+def checkpoint_path(name: str):
+    """Each account reads its own since_id, next to the single bot's."""
+    return join(
+        dirname(DEFAULT_CHECKPOINT_PATH), 'since_id-{}.txt'.format(name))
+
+
+class PoolTooter(Tooter):
+    """A Tooter that takes its turn at the shared terminal to ask."""
+
+    # a session's sockets must not cross a fork: work() logs in after it
+    connect_on_init = False
+
+    def __init__(self, name: str, review_lock, **kwargs):
+        self.name = name
+        self.review_lock = review_lock
+        Tooter.__init__(self, **kwargs)
+
+    def _amsg(self, msg, mute=False, in_reply_to_id=None):
+        print('[{}]'.format(self.name))
+        Tooter._amsg(self, msg, mute, in_reply_to_id)
+
+    def _review(self, d: dict, query_content: str, final_answers: list):
+        with self.review_lock:
+            print('[{}]'.format(self.name))
+            return Tooter._review(self, d, query_content, final_answers)
+
+
+def work(tooter: PoolTooter, brain, kwargs: dict):
+    """A worker's life: log in, ask the supervisor's brain, and listen."""
+    tooter.brain = brain
+    with tooter.review_lock:
+        tooter.log_in()
+    listen(tooter, **kwargs)
+
+
+def main(**kwargs):
+    """
+    main function
+    """
+    creds_paths = [
+        p.strip() for p in kwargs['creds_paths'].split(',') if p.strip()]
+    names = [account_name(p) for p in creds_paths]
+    if len(set(names)) != len(names):
+        logger.critical('Creds files must have different names.')
+        sys.exit(-1)
+    missing = [
+        checkpoint_path(name) for name in names
+        if not exists(checkpoint_path(name))]
+    if missing:
+        logger.critical(
+            'No since_id checkpoint at {}'.format(', '.join(missing)))
+        sys.exit(-1)
+    json_path = kwargs['json_path']
+    print(
+        'I am filling my brain with knowledge from {} ...'.format(json_path))
+    reload_interval = float(kwargs['reload_interval'])
+    stats = scan(json_path) if reload_interval > 0 else None
+    place_count, place_collection = load_places(
+        json_path, kwargs['snapshot_path'],
+        rebuild=kwargs['rebuild_snapshot'], bypass=kwargs['no_snapshot'],
+        stats=stats)
+    metrics = Registry()
+    brain = Brain(
+        place_collection, cache_size=int(kwargs['cache_size']),
+        latest_count=int(kwargs['latest_count']), metrics=metrics,
+        max_edits=int(kwargs['max_edits']))
+    # the brain keeps the places it needs; don't fork the rest into workers
+    del place_collection
+    print(
+        '... done. {} bots will share what I know about {} Pleiades '
+        'places'.format(len(names), place_count))
+    server = BrainServer(brain)
+    metrics_port = int(kwargs['metrics_port'])
+    review_lock = multiprocessing.Lock()
+    targets = {}
+    for i, (name, creds_path) in enumerate(zip(names, creds_paths)):
+        metrics_json = kwargs['metrics_json']
+        if metrics_json:
+            root, ext = splitext(metrics_json)
+            metrics_json = '{}-{}{}'.format(root, name, ext)
+        tooter = PoolTooter(name, review_lock, **dict(
+            kwargs, creds_path=creds_path, brain=brain,
+            checkpoint=Checkpoint(
+                checkpoint_path(name), int(kwargs['checkpoint_every']),
+                float(kwargs['checkpoint_interval'])),
+            metrics_port=metrics_port + i if metrics_port else 0,
+            metrics_json=metrics_json))
+        targets[name] = partial(work, tooter, server.client(), kwargs)
+    # fork the supervisor before this process starts any thread
+    supervisor = Supervisor(targets).spawn()
+    if metrics_port:
+        # the brain's own metrics, after one port for each bot
+        serve(metrics, metrics_port + len(names))
+    if stats is not None:
+        Reloader(brain, json_path, reload_interval, stats).start()
+    server.start()
+    logger.info('brain server is process {}'.format(os.getpid()))
+    Supervisor.wait(supervisor)
+    server.stop()
+
+
+if __name__ == "__main__":
+    main(
+        **configure_commandline(
+            OPTIONAL_ARGUMENTS, POSITIONAL_ARGUMENTS, DEFAULT_LOG_LEVEL))
@@ -5,21 +5,38 @@ Tootin' bot, but with supervision
 """
 
 from airtight.cli import configure_commandline
-from bs4 import BeautifulSoup
+import asyncio
 import getpass
 import json
 import logging
 from mastodon import Mastodon
-from mastodon.Mastodon import MastodonNotFoundError, MastodonUnauthorizedError
-from pleiades.mastodon.brain import Brain
-from pleiades.walker.walker import PleiadesWalker
+from mastodon.Mastodon import (
+    MastodonError, MastodonNotFoundError, MastodonUnauthorizedError)
+from pleiades.mastodon.brain import Brain, DEFAULT_LATEST_COUNT
+from pleiades.mastodon.cache import DEFAULT_ANSWER_CACHE_SIZE
+from pleiades.mastodon.checkpoint import (
+    Checkpoint, DEFAULT_CHECKPOINT_PATH, DEFAULT_FLUSH_EVERY,
+    DEFAULT_FLUSH_INTERVAL, newer)
+from pleiades.mastodon.content import extract_query
+from pleiades.mastodon.fuzzy import DEFAULT_MAX_EDITS
+from pleiades.mastodon.metrics import (
+    COUNT_BUCKETS, JSONDumper, Registry, serve)
+from pleiades.mastodon.packing import (
+    MASTODON_MAX_CHARS, pack, reply_budget, toot_length)
+from pleiades.mastodon.ratelimit import TokenBucket
+from pleiades.mastodon.reload import DEFAULT_RELOAD_INTERVAL, Reloader
+from pleiades.mastodon.snapshot import (
+    DEFAULT_SNAPSHOT_PATH, load_places, scan)
+from pleiades.mastodon.stream import (
+    Backoff, NotificationStream, STABLE_AFTER, stream_url)
 from pprint import pformat
-from os.path import abspath, join, realpath
+from os.path import abspath, realpath
 import random
-import shutil
+import requests
+from requests.adapters import HTTPAdapter
 import sys
 from textwrap import TextWrapper
-from time import sleep
+from time import monotonic, sleep
 
 DEFAULT_LOG_LEVEL = logging.WARNING
 OPTIONAL_ARGUMENTS = [
@@ -34,7 +51,36 @@ OPTIONAL_ARGUMENTS = [
     ['-w', '--veryverbose', False,
         'very verbose output (logging level == DEBUG)', False],
     ['-s', '--silent', False, 'say nothing on mastodon', False],
-    ['-c', '--creds_path', 'data/creds.json', 'where to get creds', False]
+    ['-c', '--creds_path', 'data/creds.json', 'where to get creds', False],
+    ['-p', '--snapshot_path', DEFAULT_SNAPSHOT_PATH,
+        'where to cache walked place data', False],
+    ['-r', '--rebuild_snapshot', False,
+        'walk the JSON tree and rewrite the place snapshot', False],
+    ['-b', '--no_snapshot', False,
+        'walk the JSON tree without reading or writing the snapshot', False],
+    ['-u', '--reload_interval', DEFAULT_RELOAD_INTERVAL,
+        'seconds between checks for changed place JSON (0 disables)', False],
+    ['-a', '--pipeline', False,
+        'listen with the asyncio fetch/answer/post pipeline', False],
+    ['-e', '--metrics_port', 0,
+        'serve Prometheus metrics on this local port (0 disables)', False],
+    ['-j', '--metrics_json', '',
+        'periodically dump metrics as JSON to this file', False],
+    ['-k', '--cache_size', DEFAULT_ANSWER_CACHE_SIZE,
+        'number of answers to cache (0 disables)', False],
+    ['-m', '--latest_count', DEFAULT_LATEST_COUNT,
+        'how many recently modified places "latest" answers with', False],
+    ['-x', '--max_edits', DEFAULT_MAX_EDITS,
+        'edits tolerated in names with no exact match (0 disables)', False],
+    ['-n', '--checkpoint_every', DEFAULT_FLUSH_EVERY,
+        'notifications handled between since_id checkpoint writes', False],
+    ['-t', '--checkpoint_interval', DEFAULT_FLUSH_INTERVAL,
+        'most seconds between since_id checkpoint writes', False],
+    ['-f', '--stream', False,
+        'follow the streaming API for mentions instead of polling', False],
+    ['-z', '--stream_url', '',
+        'streaming endpoint to follow (default: asked of the instance)',
+        False]
 ]
 POSITIONAL_ARGUMENTS = [
     # each row is a list with 3 elements: name, type, help text
@@ -42,7 +88,6 @@ POSITIONAL_ARGUMENTS = [
 ]
 MASTODON_MAX_RATE = 1.1   # 300 requests in 5 minutes == 1 request per second
 MASTODON_MIN_RATE = 0.13
-MASTODON_MAX_CHARS = 500
 BLOCK_QUOTE_LEADER = '     > '
 BLOCK_QUOTE_WIDTH = 80
 wrapper = TextWrapper(
@@ -53,15 +98,38 @@ answer_wrapper = TextWrapper(
     subsequent_indent=BLOCK_QUOTE_LEADER,
     replace_whitespace=False)
 MAX_ANSWER_COUNT = 5
+MAX_REPLY_PARTS = 10    # numbered parts in one reply, across all answers
+PIPELINE_QUEUE_SIZE = 100
+NOTIFICATION_PAGE_SIZE = 80   # the most Mastodon returns in one request
+HTTP_POOL_SIZE = 4
 logger = logging.getLogger(__name__)
 
 
 class Tooter:
 
+    connect_on_init = True
+
     def __init__(self, silent: bool, json_path: str, creds_path: str,
                  max_rate=MASTODON_MAX_RATE, min_rate=MASTODON_MIN_RATE,
-                 **kwargs):
+                 snapshot_path=DEFAULT_SNAPSHOT_PATH, rebuild_snapshot=False,
+                 no_snapshot=False, reload_interval=DEFAULT_RELOAD_INTERVAL,
+                 cache_size=DEFAULT_ANSWER_CACHE_SIZE,
+                 latest_count=DEFAULT_LATEST_COUNT, metrics_port=0,
+                 metrics_json='', max_edits=DEFAULT_MAX_EDITS,
+                 checkpoint_every=DEFAULT_FLUSH_EVERY,
+                 checkpoint_interval=DEFAULT_FLUSH_INTERVAL, stream_url='',
+                 brain=None, api=None, checkpoint=None, **kwargs):
         self.api = None
+        self.stream_url = stream_url
+        if checkpoint is None:
+            checkpoint = Checkpoint(
+                DEFAULT_CHECKPOINT_PATH, int(checkpoint_every),
+                float(checkpoint_interval))
+        self.checkpoint = checkpoint
+        self.limiter = TokenBucket()
+        self.metrics = Registry()
+        self.metrics_port = int(metrics_port)
+        self.metrics_json = metrics_json
         self.min_period = 1.0/max_rate
         self.max_period = 1.0/min_rate
         self.silent = silent
@@ -69,28 +137,77 @@ class Tooter:
             logger.warning(
                 'Silent mode is engaged. Bot will post nothing to mastodon.')
 
+        self.reloader = None
+        if brain is not None:
+            self.brain = brain
+            self._place_count = len(brain.places)
+            if brain.metrics is None:
+                brain.metrics = self.metrics
+        else:
+            self._load_brain(
+                json_path, snapshot_path, rebuild_snapshot, no_snapshot,
+                reload_interval, cache_size, latest_count, max_edits)
+        self.creds_path = creds_path
+        if api is not None:
+            self.api = api
+        if self.connect_on_init:
+            self.log_in()
+
+    def log_in(self):
+        """Connect to the instance (unless given an api) and say so."""
+        if self.api is None:
+            self._connect(self.creds_path)
+        self._amsg('The bot is in. It is under human supervision.')
+
+    def _load_brain(self, json_path, snapshot_path, rebuild_snapshot,
+                    no_snapshot, reload_interval, cache_size, latest_count,
+                    max_edits):
         # load brain from pleiades json
-        path = abspath(realpath(json_path))
         print(
             'I am filling my brain with knowledge from {} ...'.format(
                 json_path))
-        walker = PleiadesWalker(path=path)
-        self.place_count, place_collection = walker.walk()
-        self.brain = Brain(place_collection)
-        del walker
+        # the reloader's baseline is taken before the walk, so files that
+        # change during it are reloaded rather than taken as current
+        stats = scan(json_path) if float(reload_interval) > 0 else None
+        self._place_count, place_collection = load_places(
+            json_path, snapshot_path, rebuild=rebuild_snapshot,
+            bypass=no_snapshot, stats=stats)
+        self.brain = Brain(
+            place_collection, cache_size=int(cache_size),
+            latest_count=int(latest_count), metrics=self.metrics,
+            max_edits=int(max_edits))
+        if stats is not None:
+            self.reloader = Reloader(
+                self.brain, json_path, float(reload_interval), stats)
         print(
             '... done. I know things about {} Pleiades places'.format(
                 self.place_count))
 
+    @property
+    def place_count(self):
+        """Places the brain knows about now, counting hot reloads."""
+        places = getattr(self.brain, 'places', None)
+        if places is None:
+            # a pool worker's brain is a client and only knows the start
+            return self._place_count
+        return len(places)
+
+    def _connect(self, creds_path):
         # connect to mastodon
         path = abspath(realpath(creds_path))
         with open(path, 'r') as f:
             creds = json.load(f)
         del f
+        # one keep-alive session, so paging and posting reuse connections
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         api = Mastodon(
             creds['client_id'],
             creds['client_secret'],
-            api_base_url=creds['api_base_url']
+            api_base_url=creds['api_base_url'],
+            session=session
         )
         email = input(
             'Enter email address for bot account on {}: '.format(
@@ -99,7 +216,8 @@ class Tooter:
             'Enter password for {} on {}: '.format(
                 email, creds['api_base_url']))
         try:
-            access_token = api.log_in(email, pwd, scopes=['read', 'write'])
+            access_token = self._call(
+                api.log_in, email, pwd, scopes=['read', 'write'])
         except MastodonUnauthorizedError:
             logger.critical('Login failed: bad credentials.')
             sys.exit(-1)
@@ -109,53 +227,269 @@ class Tooter:
             creds['client_id'],
             creds['client_secret'],
             access_token,
-            api_base_url=creds['api_base_url']
+            api_base_url=creds['api_base_url'],
+            session=session
         )
         del creds
         del access_token
-        self._amsg('The bot is in. It is under human supervision.')
 
     def listen(self, mute=False):
         self._amsg(
             'The bot is listening. It knows about {} #PleiadesGazetteer '
             'places'.format(self.place_count))
-        since_path = join('data', 'since_id.txt')
-        bak_path = join('data', 'since_id.txt.bak')
-        with open(since_path, 'r') as f:
-            since_id = f.read().strip()
-        del f
-        shutil.copy(since_path, bak_path)
+        since_id = self._read_since_id()
+        self._start_background()
+        try:
+            while True:
+                period = random.uniform(self.min_period, self.max_period)
+                logger.debug('sleeping for {} seconds'.format(period))
+                sleep(period)
+                logger.debug('awake!')
+                since_id = self._catch_up(since_id)
+                logger.debug(
+                    'rate budget utilization: {:.0%}'.format(
+                        self.limiter.utilization()))
+                self.checkpoint.tick()
+        finally:
+            self.checkpoint.close()
+
+    def listen_stream(self, stopped=None, backoff=None):
+        """
+        Listen on the user stream, so mentions arrive as they are made.
+
+        Each connection is opened first and then anything newer than
+        since_id is fetched by polling, so nothing that arrived while
+        disconnected (or while connecting) is missed; the stream's own
+        copies of those are skipped. A dropped stream, or an API error
+        (a 502, 503 or 429) while catching up, is retried after an
+        exponential backoff (a stream.Backoff), which is only reset once
+        a connection has delivered a notification or stayed up for
+        stream.STABLE_AFTER seconds. Apart from those
+        catch-up polls, no API calls are made while idle. Stops once
+        stopped (a threading.Event) is set and the stream ends.
+        """
+        self._amsg(
+            'The bot is listening. It knows about {} #PleiadesGazetteer '
+            'places'.format(self.place_count))
+        since_id = self._read_since_id()
+        self._start_background()
+        stream = NotificationStream(
+            self._stream_url(), getattr(self.api, 'access_token', None))
+        if backoff is None:
+            backoff = Backoff()
+        try:
+            while stopped is None or not stopped.is_set():
+                try:
+                    stream.connect()
+                    connected = monotonic()
+                    stable = False
+                    since_id = self._catch_up(since_id)
+                    for n in stream.events():
+                        if not stable and (
+                                n is not None or
+                                monotonic() - connected >= STABLE_AFTER):
+                            # a server that accepts and drops at once
+                            # must not be reconnected to every second
+                            backoff.reset()
+                            stable = True
+                        if n is not None and newer(n['id'], since_id):
+                            self._handle_notification(n)
+                            self._write_since_id(n['id'])
+                            since_id = n['id']
+                        self.checkpoint.tick()
+                    logger.warning('stream closed by the server')
+                except (MastodonError, OSError) as e:
+                    logger.warning('stream failed: {}'.format(e))
+                self.metrics.counter(
+                    'stream_disconnects_total',
+                    'times the notification stream was lost').inc()
+                if stopped is not None and stopped.is_set():
+                    break
+                delay = backoff.next()
+                logger.info('reconnecting in {:.1f} seconds'.format(delay))
+                sleep(delay)
+        finally:
+            stream.close()
+            self.checkpoint.close()
+
+    def _stream_url(self):
+        if self.stream_url:
+            return self.stream_url
+        base = getattr(self.api, 'api_base_url', '')
+        try:
+            instance = self._call(self.api.instance)
+            base = instance['urls']['streaming_api'] or base
+        except Exception as e:
+            logger.warning(
+                'using {} for streaming: {}'.format(base, e))
+        return stream_url(base)
+
+    def _catch_up(self, since_id):
+        """Handle everything newer than since_id; return the newest id."""
+        for notification in self._poll(since_id):
+            self._handle_notification(notification)
+            self._write_since_id(notification['id'])
+            since_id = notification['id']
+        return since_id
+
+    async def listen_async(self):
+        """
+        Listen with separate fetch, answer and post stages.
+
+        The stages are joined by queues and each handles notifications in
+        order, so polling and answer computation carry on while a human
+        considers a reply or a multi-part reply is being posted. Polling
+        and posting keep the same rate envelope as listen().
+        """
+        self._amsg(
+            'The bot is listening. It knows about {} #PleiadesGazetteer '
+            'places'.format(self.place_count))
+        since_id = self._read_since_id()
+        self._start_background()
+        answer_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        post_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        try:
+            await asyncio.gather(
+                self._fetch_stage(since_id, answer_queue),
+                self._answer_stage(answer_queue, post_queue),
+                self._post_stage(post_queue))
+        finally:
+            self.checkpoint.close()
+
+    async def _fetch_stage(self, since_id, answer_queue):
         while True:
             period = random.uniform(self.min_period, self.max_period)
             logger.debug('sleeping for {} seconds'.format(period))
-            sleep(period)
-            logger.debug('awake!')
-            notifications = self.api.notifications(since_id=since_id)
+            await asyncio.sleep(period)
+            more = True
+            while more:
+                page, since_id, more = await asyncio.to_thread(
+                    self._next_page, since_id)
+                for notification in page:
+                    await answer_queue.put(notification)
+            self.checkpoint.tick()
+
+    async def _answer_stage(self, answer_queue, post_queue):
+        while True:
+            n = await answer_queue.get()
             logger.debug(
-                'read {} new notifications'.format(len(notifications)))
-            for notification in notifications[::-1]:
-                self._handle_notification(notification)
-            if len(notifications) > 0:
-                since_id = notifications[0]['id']
-                with open(join('data', 'since_id.txt'), 'w') as f:
-                    f.write(str(since_id))
-                del f
+                'Notification {} created at: {}'.format(
+                    n['id'], n['created_at'].isoformat()))
+            if n['type'] == 'mention':
+                if self.checkpoint.is_answered(n['id']):
+                    logger.info('already answered {}'.format(n['id']))
+                    composed = None
+                else:
+                    composed = await asyncio.to_thread(self._compose, n)
+            else:
+                print(self._serialize(n['type'], n))
+                composed = None
+            await post_queue.put((n, composed))
+            answer_queue.task_done()
+
+    async def _post_stage(self, post_queue):
+        while True:
+            n, composed = await post_queue.get()
+            if composed is not None:
+                query_content, final_answers = composed
+                approved = await asyncio.to_thread(
+                    self._review, n, query_content, final_answers)
+                if approved:
+                    self.checkpoint.claim(n['id'])
+                    for answer in final_answers:
+                        print('')
+                        await asyncio.to_thread(
+                            self._amsg, answer, in_reply_to_id=n['id'])
+            self._write_since_id(n['id'])
+            post_queue.task_done()
+
+    def _start_background(self):
+        if self.reloader is not None and not self.reloader.is_alive():
+            self.reloader.start()
+        if self.metrics_port:
+            serve(self.metrics, self.metrics_port)
+            self.metrics_port = 0
+        if self.metrics_json:
+            JSONDumper(self.metrics, self.metrics_json).start()
+            self.metrics_json = ''
+
+    def _poll(self, since_id):
+        """
+        Yield every notification newer than since_id, oldest first.
+
+        Pages are fetched one at a time, each the page just after the
+        newest notification seen (min_id), until a short page shows the
+        backlog is cleared; only one page is held at once.
+        """
+        more = True
+        while more:
+            page, since_id, more = self._next_page(since_id)
+            yield from page
+
+    def _next_page(self, since_id):
+        """
+        Return the page after since_id (oldest first), the id to page on
+        from, and whether the backlog may go on past it.
+        """
+        page = self._fetch_page(since_id)
+        if len(page) > 0:
+            since_id = page[0]['id']
+        return page[::-1], since_id, len(page) >= NOTIFICATION_PAGE_SIZE
+
+    def _fetch_page(self, min_id):
+        """The page of notifications just after min_id, newest first."""
+        with self.metrics.time('poll_seconds', 'notification poll latency'):
+            notifications = self._call(
+                self.api.notifications, min_id=min_id,
+                limit=NOTIFICATION_PAGE_SIZE)
+        logger.debug(
+            'read {} new notifications'.format(len(notifications)))
+        self.metrics.histogram(
+            'notifications_per_poll', 'notifications returned by a poll',
+            COUNT_BUCKETS).observe(len(notifications))
+        return notifications
+
+    def _read_since_id(self):
+        return self.checkpoint.load()
+
+    def _write_since_id(self, since_id):
+        self.checkpoint.advance(since_id)
 
     def _amsg(self, msg, mute=False, in_reply_to_id=None):
         print(msg)
         if not mute and not self.silent and self.api is not None:
-            try:
-                self.api.status_post(msg, in_reply_to_id=in_reply_to_id)
-            except MastodonNotFoundError as e:
-                self.api.status_post(msg)
-                logger.warning(
-                    ('\n'.join(
-                        (
-                            'message posted without reply_to id because '
-                            'instance responded with "{}"'
-                            ''.format(':'.join([str(a) for a in e.args])),
-                            'in_reply_to_id: "{}"'.format(in_reply_to_id)
-                        ))))
+            with self.metrics.time('post_seconds', 'time to post a toot'):
+                self._post(msg, in_reply_to_id)
+
+    def _post(self, msg, in_reply_to_id):
+        try:
+            self._call(
+                self.api.status_post, msg, in_reply_to_id=in_reply_to_id)
+        except MastodonNotFoundError as e:
+            self._call(self.api.status_post, msg)
+            logger.warning(
+                ('\n'.join(
+                    (
+                        'message posted without reply_to id because '
+                        'instance responded with "{}"'
+                        ''.format(':'.join([str(a) for a in e.args])),
+                        'in_reply_to_id: "{}"'.format(in_reply_to_id)
+                    ))))
+
+    def _call(self, method, *args, **kwargs):
+        """Make a Mastodon API call within the shared rate budget."""
+        waited = self.limiter.acquire()
+        self.metrics.counter(
+            'rate_limit_wait_seconds_total',
+            'time spent waiting on the rate limiter').inc(waited)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            api = getattr(method, '__self__', None)
+            self.limiter.observe(
+                getattr(api, 'ratelimit_limit', None),
+                getattr(api, 'ratelimit_remaining', None),
+                getattr(api, 'ratelimit_reset', None))
 
     def _handle_notification(self, n: dict):
         logger.debug(
@@ -223,109 +557,101 @@ class Tooter:
         logger.debug('served_lines: "{}"'.format(served_lines))
         print('\n'.join(served_lines))
 
-    def _cook_answer(self, raw, querent):
-        maximum = MASTODON_MAX_CHARS - 12  # room for multi-part
-        reply = '{}\n\n{}'.format(querent, raw)
-        if len(reply) <= maximum:
-            logger.debug('raw answer is sufficiently short')
-            return reply
-        logger.warning(
-            'Raw answer exceeds maximum {} characters. Attempting to '
-            'truncate...'.format(maximum))
-        reduce_by = len(reply) - maximum
-        chunks = [(i, c, len(c)) for i, c in enumerate(raw.split('\n\n'))]
-        chunks.sort(key=lambda tup: tup[2])
-        chunk_i, chunk, chunk_len = chunks[-1]
-        logger.debug('The longest chunk is "{}"'.format(chunk))
-        lines = [(i, l, len(l)) for i, l in enumerate(chunk.split('\n'))]
-        lines.sort(key=lambda tup: tup[2])
-        line_i, line, line_len = lines[-1]
-        logger.debug('The longest line is "{}"'.format(line))
-        if line_len <= reduce_by:
-            raise RuntimeError('the answer will be eliminated')
-        goal = line_len - reduce_by
-        words = line.split()
-        while True:
-            words = words[:-1]
-            line = ' '.join(words)
-            if len(line) <= goal - 3:  # leave room for ellipsis
-                if line.endswith('...'):
-                    pass
-                elif line.endswith('.'):
-                    line += '..'
-                else:
-                    line += '...'
-                break
-        logger.debug('The line has been truncated by {} characters to "{}"')
-        lines[-1] = (line_i, line, len(line))
-        lines.sort(key=lambda tup: tup[0])
-        chunk = '\n'.join([line for line_i, line, line_len in lines])
-        chunks[-1] = (chunk_i, chunk, len(chunk))
-        chunks.sort(key=lambda tup: tup[0])
-        cooked = '\n\n'.join([chunk for chunk_i, chunk, chunk_len in chunks])
-        logger.debug('The cooked answer is: "{}"'.format(cooked))
-        reply = '{}\n\n{}'.format(querent, cooked)
-        logger.debug('The cooked reply is "{}"'.format(reply))
-        return cooked
+    def _cook_answer(self, raw, querent, max_parts=MAX_REPLY_PARTS):
+        budget = reply_budget(querent)
+        parts = pack(raw, budget, max_parts)
+        if len(parts) > 1:
+            logger.info(
+                'Raw answer exceeds maximum {} characters. Split into {} '
+                'parts.'.format(budget, len(parts)))
+        return ['{}\n\n{}'.format(querent, part) for part in parts]
 
     def _handle_mention(self, d: dict):
+        if self.checkpoint.is_answered(d['id']):
+            logger.info('already answered {}'.format(d['id']))
+            return
+        query_content, final_answers = self._compose(d)
+        if self._review(d, query_content, final_answers):
+            self.checkpoint.claim(d['id'])
+            for answer in final_answers:
+                print('')
+                self._amsg(answer, in_reply_to_id=d['id'])
+
+    def _compose(self, d: dict):
         querent = '@{}'.format(d['account']['acct'])
         query_id = d['id']
         logger.info(
             'got a mention from {} with id="{}"'.format(
                 querent, query_id))
-        soup = BeautifulSoup(d['status']['content'], 'html.parser')
-        query = soup.get_text()
-        words = query.split()
-        query_content = ' '.join([w for w in words if not w.startswith('@')])
-        raw_answers = self.brain.answer(query_content)
-        cooked_answers = [
-            self._cook_answer(a, querent) for a in raw_answers]
-        final_answers = '\n\n'.join(cooked_answers)
-        if len(final_answers) < MASTODON_MAX_CHARS:
+        query_content = self._extract_query(d)
+        raw_answers = self._answer(query_content)
+        with self.metrics.time('cook_seconds', 'time to cook answers'):
+            cooked_answers = [
+                self._cook_answer(a, querent) for a in raw_answers]
+        final_answers = '\n\n'.join(
+            [part for parts in cooked_answers for part in parts])
+        if toot_length(final_answers) < MASTODON_MAX_CHARS:
             final_answers = [final_answers]
         elif len(cooked_answers) == 1:
-            raise RuntimeError('this should never happen')
+            final_answers = self._number(cooked_answers[0])
         else:
             answer_count = len(cooked_answers)
             if answer_count > MAX_ANSWER_COUNT:
-                final_answers = [self._cook_answer(
+                final_answers = self._cook_answer(
                     'I have found {} place resources relevant to your query. '
                     'In order to avoid opprobrium, I am only allowed to '
                     'return the first {} answers. I will provide information '
                     'about each of those place resources in subsequent '
                     'replies.'.format(
-                        answer_count, MAX_ANSWER_COUNT), querent)]
+                        answer_count, MAX_ANSWER_COUNT), querent)
             else:
-                final_answers = [self._cook_answer(
+                final_answers = self._cook_answer(
                     'I have found {} place resources relevant to your query. '
                     'I will provide information about each of them in '
-                    'subsequent replies.'.format(answer_count), querent)]
-            for i, answer in enumerate(cooked_answers):
-                if i >= MAX_ANSWER_COUNT:
-                    break
-                final_answers.append(
-                    '{} {}/{}'.format(
-                        answer, i+1, min(answer_count, MAX_ANSWER_COUNT)))
+                    'subsequent replies.'.format(answer_count), querent)
+            # each answer gets an equal share of the parts allowed
+            share = max(
+                1, MAX_REPLY_PARTS // min(answer_count, MAX_ANSWER_COUNT))
+            final_answers.extend(self._number(
+                [part for a in raw_answers[:MAX_ANSWER_COUNT]
+                 for part in self._cook_answer(a, querent, share)]))
+        return query_content, final_answers
+
+    def _extract_query(self, d: dict):
+        return extract_query(d['status']['content'])
+
+    def _answer(self, query_content: str):
+        return self.brain.answer(query_content)
+
+    def _number(self, parts: list):
+        return [
+            '{} {}/{}'.format(part, i+1, len(parts))
+            for i, part in enumerate(parts)]
 
+    def _review(self, d: dict, query_content: str, final_answers: list):
         print(''.ljust(80, '='))
         print('Mention from {} with id="{}":\n'.format(
-            self._serialize('user', d['account']), query_id))
+            self._serialize('user', d['account']), d['id']))
         self._print_block_quote(query_content)
         print('\nMy brain thinks a good answer would be:')
         for answer in final_answers:
             print('')
             self._print_block_quote(answer)
         print('')
-        verdict = input('Should I post the answer? [y/n]: ')
-        if not verdict or verdict.lower() != 'y':
-            pass
-        else:
-            for answer in final_answers:
-                print('')
-                self._amsg(answer, in_reply_to_id=d['id'])
-                period = random.uniform(self.min_period, self.min_period * 3.0)
-                sleep(period)
+        with self.metrics.time(
+                'approval_wait_seconds', 'time waiting for human approval'):
+            verdict = input('Should I post the answer? [y/n]: ')
+        return bool(verdict) and verdict.lower() == 'y'
+
+
+def listen(tooter: Tooter, stream=False, pipeline=False, **kwargs):
+    """Listen in the mode the command line asked for."""
+    if stream:
+        tooter.listen_stream()
+    elif pipeline:
+        asyncio.run(tooter.listen_async())
+    else:
+        tooter.listen()
 
 
 def main(**kwargs):
@@ -333,7 +659,8 @@ def main(**kwargs):
     main function
     """
     tooter = Tooter(**kwargs)
-    tooter.listen()
+    listen(tooter, **kwargs)
+
 
 if __name__ == "__main__":
     main(
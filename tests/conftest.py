@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fixtures shared by the tests
+"""
+
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.synthetic import make_places
+import pytest
+from scripts.replay import read_log, write_log
+
+SYNTHETIC_PLACES = 300
+SYNTHETIC_MENTIONS = 80
+
+
+@pytest.fixture
+def mentions(tmp_path):
+    """A brain over synthetic places and a log of mentions to put to it."""
+    place_count, place_collection = make_places(SYNTHETIC_PLACES)
+    brain = Brain(place_collection)
+    log_path = str(tmp_path / 'mentions.jsonl')
+    write_log(log_path, SYNTHETIC_MENTIONS, brain)
+    return brain, read_log(log_path)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Questions the brain answers from its indexes
+"""
+
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.synthetic import make_places
+
+
+def test_latest_answers_with_the_newest_places_only():
+    place_count, place_collection = make_places(300)
+    brain = Brain(place_collection, latest_count=10)
+    places = list(place_collection.places.values())
+    newest = max([p.last_modified for p in places])
+    expected = {p.id for p in places if p.last_modified == newest}
+    handler, (renderer, (trigger, results, tokens)) = brain._plan('latest')
+    assert {p.id for p in results} == expected
+    assert len(brain.answer('list latest')) == 10
+
+
+def test_age_hint_lists_the_places_it_counted():
+    place_count, place_collection = make_places(300)
+    brain = Brain(place_collection)
+    for question in ['when 300 bc', 'how old ad 14', 'in 300 bc',
+                     'between 100 bc and ad 100']:
+        handler, (renderer, (trigger, results, tokens)) = brain._plan(
+            question)
+        assert len(results) > 1, question
+        hint = brain.answer(question)[0].rsplit('"', 2)[1]
+        assert len(brain.answer(hint)) == len(results), question
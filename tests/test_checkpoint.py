@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A bot killed mid-replay and restarted on its checkpoint never answers twice
+"""
+
+import random
+from scripts.crash_replay import trial
+
+TRIALS = 4
+CHECKPOINT_EVERY = 10
+
+
+def test_replay_after_kill_answers_once(mentions):
+    brain, notifications = mentions
+    r = random.Random(0)
+    for i in range(TRIALS):
+        kill_after, duplicated, unanswered = trial(
+            brain, notifications, r, CHECKPOINT_EVERY)
+        assert duplicated == [], 'killed at reply {}'.format(kill_after)
+        # a kill between claiming a reply and posting it loses that one
+        assert len(unanswered) <= 1, 'killed at reply {}'.format(kill_after)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Name lookups return the places the collection's own name keys would
+"""
+
+from itertools import permutations
+import json
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.places import place_id
+from pleiades.mastodon.store import compact
+from pleiades.mastodon.synthetic import make_name, make_places
+import pytest
+import random
+
+# trimmed from pleiades-datasets JSON, keeping the fields names come from
+RECORDS = [
+    {
+        'id': '579885',
+        'uri': 'https://pleiades.stoa.org/places/579885',
+        'title': 'Athenae',
+        'description': 'The chief city of ancient Attica.',
+        'placeTypes': ['settlement'],
+        'reprPoint': [23.726247, 37.971532],
+        'names': [
+            {'id': 'athenai', 'nameType': 'geographic', 'language': 'grc',
+             'attested': 'Ἀθῆναι',
+             'romanized': 'Athenai, Athênai, Athens, Athenae',
+             'start': -750, 'end': 640},
+            {'id': 'athenae', 'nameType': 'geographic', 'language': 'la',
+             'attested': 'Athenae', 'romanized': 'Athenae',
+             'start': -30, 'end': 640}],
+        'locations': [],
+        'modified': '2019-08-13T11:39:23Z'},
+    {
+        'id': '423025',
+        'uri': 'https://pleiades.stoa.org/places/423025',
+        'title': 'Roma',
+        'description': 'The capital of the Roman Republic and Empire.',
+        'placeTypes': ['settlement'],
+        'reprPoint': [12.486137, 41.891775],
+        'names': [
+            {'id': 'roma', 'nameType': 'geographic', 'language': 'la',
+             'attested': 'Roma', 'romanized': 'Roma, Rome',
+             'start': -750, 'end': 2100},
+            {'id': 'rhome', 'nameType': 'geographic', 'language': 'grc',
+             'attested': 'Ῥώμη', 'romanized': 'Rhome, Rhōmē',
+             'start': -330, 'end': 640}],
+        'locations': [],
+        'modified': '2019-06-25T17:32:05Z'}
+]
+QUERIES = [
+    ['athenae'], ['athens'], ['athen'], ['then'], ['ἀθῆναι'], ['roma'],
+    ['rome'], ['rhome'], ['rom'], ['me'], ['roma', 'rome'],
+    ['athenai', 'athens']]
+
+
+def by_permutations(collection, tokens: list):
+    """Ids the old lookup found: every permutation, 'name' and 'in_name'."""
+    if len(tokens) == 1:
+        candidates = tokens
+    else:
+        candidates = [' '.join(t) for t in permutations(tokens)]
+    found = set()
+    for candidate in candidates:
+        for key in ['name', 'in_name']:
+            found.update(
+                [place_id(p) for p in collection.get(key, candidate)])
+    return found
+
+
+def by_index(brain: Brain, tokens: list):
+    return {place_id(p) for p in brain._find_named(tokens, fuzzy=False)}
+
+
+def test_synthetic_names_match_permutation_lookup():
+    place_count, collection = make_places(300)
+    brain = Brain(compact(collection))
+    r = random.Random(0)
+    titles = [p.title.lower() for p in collection.places.values()]
+    queries = [[make_name(r).lower()[:r.randint(3, 6)]] for i in range(50)]
+    queries.extend([t.split() for t in r.sample(titles, 50)])
+    queries.extend([t.split()[::-1] for t in r.sample(titles, 50)])
+    for tokens in queries:
+        assert by_index(brain, tokens) == by_permutations(collection, tokens)
+
+
+def test_walked_names_match_permutation_lookup(tmp_path):
+    walker = pytest.importorskip('pleiades.walker.walker')
+    for record in RECORDS:
+        path = tmp_path / '{}.json'.format(record['id'])
+        path.write_text(json.dumps(record), encoding='utf-8')
+    place_count, collection = walker.PleiadesWalker(
+        path=str(tmp_path)).walk()
+    brain = Brain(compact(collection))
+    assert set(brain.places) == {r['id'] for r in RECORDS}
+    for tokens in QUERIES:
+        assert by_index(brain, tokens) == by_permutations(collection, tokens)
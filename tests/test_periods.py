@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Age queries find places by the years they were active
+"""
+
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.places import place_id, place_periods
+
+# Pleiades JSON dates names and locations; periods may be keys or years
+RECORDS = [
+    {'id': '579885', 'title': 'Athenae',
+     'names': [{'romanized': 'Athenai', 'start': -750, 'end': 640}],
+     'locations': []},
+    {'id': '423025', 'title': 'Roma',
+     'timePeriods': ['roman'],
+     'locations': [{'title': 'Forum', 'start': -500, 'end': 300}]},
+    {'id': '999999', 'title': 'Nusquam', 'names': ['Nusquam']}]
+
+
+def test_dict_places_have_periods():
+    assert place_periods(RECORDS[0]) == [(-750, 640)]
+    assert sorted(place_periods(RECORDS[1])) == [(-500, 300), (-30, 300)]
+    assert place_periods(RECORDS[-1]) == []
+
+
+def test_age_finds_dict_places():
+    brain = Brain(RECORDS)
+    found = brain._find_active((-400, -400))
+    assert sorted([place_id(p) for p in found]) == ['423025', '579885']
+    found = brain._find_active((500, 1000))
+    assert [place_id(p) for p in found] == ['579885']
+    assert brain.answer('when roma')[0].startswith(
+        'Roma was active from 500 BC to AD 300.')
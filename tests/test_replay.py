@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The offline replay harness answers a generated log end to end
+"""
+
+from scripts.replay import LocalMastodon, replay, ReplayTooter, STAGES
+
+
+def test_replay_answers_every_mention(mentions):
+    brain, notifications = mentions
+    api = LocalMastodon()
+    tooter = ReplayTooter(brain, api)
+    replay(tooter, api, notifications)
+    answered = {post['in_reply_to_id'] for post in api.posted}
+    assert answered == {n['id'] for n in notifications}
+    assert len(tooter.latencies) == len(notifications)
+    for stage in STAGES:
+        assert tooter.timings[stage] > 0.0
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Near queries find places by their representative points
+"""
+
+from pleiades.mastodon.brain import Brain
+from pleiades.mastodon.places import place_id, place_point
+
+# Pleiades JSON keeps reprPoint in GeoJSON order, [longitude, latitude]
+RECORDS = [
+    {'id': '579885', 'title': 'Athenae', 'reprPoint': [23.726247, 37.971532]},
+    {'id': '423025', 'title': 'Roma', 'reprPoint': [12.486137, 41.891775]},
+    {'id': '422995', 'title': 'Ostia', 'reprPoint': [12.288, 41.756]},
+    {'id': '999999', 'title': 'Nusquam'}]
+
+
+def test_dict_places_are_located():
+    assert place_point(RECORDS[0]) == (37.971532, 23.726247)
+    assert place_point(RECORDS[-1]) is None
+
+
+def test_near_finds_dict_places():
+    brain = Brain(RECORDS, near_count=2)
+    found = brain._find_near(['41.9', '12.5'])
+    assert [place_id(p) for p in found] == ['423025', '422995']
+    found = brain._find_near(['roma', 'within', '50', 'km'])
+    assert [place_id(p) for p in found] == ['422995']